@@ -0,0 +1,65 @@
+"""
+Align candles of many symbols: outer joining one DataFrame per symbol
+versus filling the preallocated blocks of a CandlePanel.
+
+    python benchmarks/bench_candle_panel.py [n_symbols] [n_bars]
+"""
+
+from __future__ import print_function
+import sys
+
+import numpy as np
+import pandas as pd
+
+from common import best_of
+import payloads
+from finnhub_python.decorators import to_ohlcv_arrays, to_ohlcv_frame
+from finnhub_python.panel import CandlePanel
+
+
+def make_bars(n_symbols, n_bars):
+    """Staggered listings with a few gaps, like a real universe."""
+    rng = np.random.RandomState(0)
+    out = {}
+    for i in range(n_symbols):
+        symbol = 'SYM{}'.format(i)
+        bars = payloads.candles(n_bars, symbol, start=1500000000 + 60 * rng.randint(0, n_bars // 10))
+        keep = rng.rand(n_bars) > 0.02
+        out[symbol] = {k: np.asarray(v)[keep].tolist() if isinstance(v, list) else v
+                       for k, v in bars.items()}
+    return out
+
+
+def outer_join(bars):
+    frames = {s: to_ohlcv_frame(b) for s, b in bars.items()}
+    return {f: pd.concat({s: df[f] for s, df in frames.items()}, axis=1, sort=True)
+            for f in ('o', 'h', 'l', 'c', 'v')}
+
+
+def panel(bars):
+    return CandlePanel.from_bars({s: to_ohlcv_arrays(b) for s, b in bars.items()})
+
+
+def run(n_symbols=1000, n_bars=500):
+    bars = make_bars(n_symbols, n_bars)
+    joined = outer_join(bars)['c']
+    aligned = panel(bars).to_frame('c')
+    assert joined.shape == aligned.shape
+    return {
+        'symbols': n_symbols,
+        'bars': n_bars,
+        'outer_join_ms': best_of(lambda: outer_join(bars), 1) * 1e3,
+        'panel_ms': best_of(lambda: panel(bars), 1) * 1e3,
+    }
+
+
+def main(n_symbols=1000, n_bars=500):
+    result = run(n_symbols, n_bars)
+    print('{symbols} symbols x {bars} bars'.format(**result))
+    print('outer join   {:8.1f} ms'.format(result['outer_join_ms']))
+    print('CandlePanel  {:8.1f} ms  ({:.1f}x)'.format(
+        result['panel_ms'], result['outer_join_ms'] / result['panel_ms']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,47 @@
+"""
+Compare per-call latency of one-shot requests.get calls against
+the pooled keep-alive session used by FinnHubBase.call_api.
+
+    python benchmarks/bench_connection_pool.py [n_calls]
+"""
+
+from __future__ import print_function
+import sys
+import time
+
+import requests
+
+import common  # noqa: F401, puts the repo root on sys.path
+from finnhub_python.base import FinnHubBase
+from finnhub_python.ratelimit import RateLimiter
+from mock_server import MockFinnHubServer
+
+
+def time_calls(call, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        call()
+    return (time.perf_counter() - start) / n
+
+
+def main(n=500):
+    with MockFinnHubServer() as server:
+        url = server.base_uri + '/stock/profile2'
+        params = {'symbol': 'AAPL', 'token': 'bench'}
+
+        unpooled = time_calls(
+            lambda: requests.get(url, params=params, timeout=5).json(), n)
+
+        unlimited = RateLimiter({'default': 10 ** 9})
+        with FinnHubBase('bench', rate_limiter=unlimited) as api:
+            api.base_uri = server.base_uri
+            pooled = time_calls(
+                lambda: api.get_stock_company_profile2('AAPL'), n)
+
+    print('requests.get     {:8.1f} us/call'.format(unpooled * 1e6))
+    print('pooled call_api  {:8.1f} us/call'.format(pooled * 1e6))
+    print('speedup          {:8.2f}x'.format(unpooled / pooled))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
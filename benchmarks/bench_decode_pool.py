@@ -0,0 +1,86 @@
+"""
+Multi-symbol option chain and candle batches decoded on the download
+threads versus in a DecodePool. The mock server runs in its own process
+so it does not compete for this process's GIL.
+
+    python benchmarks/bench_decode_pool.py [n_symbols] [processes]
+"""
+
+from __future__ import print_function
+import multiprocessing
+import os
+import sys
+import time
+
+import common  # noqa: F401, puts the repo root on sys.path
+import payloads
+from finnhub_python.client import FinnHubClient
+from finnhub_python.decode_pool import DecodePool
+from finnhub_python.ratelimit import RateLimiter
+from mock_server import MockFinnHubServer
+
+
+def serve(queue):
+    with MockFinnHubServer(payloads.realistic_payload) as server:
+        queue.put(server.base_uri)
+        queue.get()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run(n_symbols=100, processes=None, workers=16):
+    processes = processes or os.cpu_count() or 1
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(queue,))
+    server.start()
+    base_uri = queue.get()
+    symbols = ['SYM{}'.format(i) for i in range(n_symbols)]
+    client = FinnHubClient('bench', rate_limiter=RateLimiter({'default': 10 ** 9}), pool_size=workers)
+    client.base_uri = base_uri
+    out = {'symbols': n_symbols, 'processes': processes, 'threads': workers}
+    try:
+        with DecodePool(processes) as pool:
+            # Start the workers outside the timings
+            pool.decode(len, b'')
+            for name, method, kwargs, finish in [
+                ('option_chain', client.get_stock_option_chain_multi, {}, lambda c: c.to_frame()),
+                ('candles', client.get_stock_candles_multi, {'count': 5000}, lambda df: df),
+            ]:
+                def batch(**extra):
+                    result = method(symbols, max_workers=workers, **dict(kwargs, **extra))
+                    assert not any(isinstance(v, Exception) for v in result.values())
+                    return [finish(v) for v in result.values()]
+
+                # Let the server encode every body once before timing
+                batch()
+                threads, _ = timed(batch)
+                pooled, _ = timed(lambda: batch(decode_pool=pool))
+                out[name] = {
+                    'threads_seconds': threads,
+                    'decode_pool_seconds': pooled,
+                    'threads_symbols_per_sec': n_symbols / threads,
+                    'decode_pool_symbols_per_sec': n_symbols / pooled,
+                }
+    finally:
+        client.close()
+        queue.put(None)
+        server.join()
+    return out
+
+
+def main(n_symbols=100, processes=None):
+    result = run(n_symbols, processes)
+    print('{symbols} symbols, {threads} threads, {processes} decode processes'.format(**result))
+    for name in ('option_chain', 'candles'):
+        r = result[name]
+        print('{:13s} threads {:6.2f} s   decode pool {:6.2f} s   ({:.2f}x)'.format(
+            name, r['threads_seconds'], r['decode_pool_seconds'],
+            r['threads_seconds'] / r['decode_pool_seconds']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""
+Financials as reported for a universe: downloading and flattening every
+filing on each run versus a FinancialsStore that is updated
+incrementally and queried for one concept across all symbols.
+
+    python benchmarks/bench_financials_store.py [n_symbols] [n_reports]
+"""
+
+from __future__ import print_function
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import common  # noqa: F401, puts the repo root on sys.path
+import payloads
+from finnhub_python.client import FinnHubClient
+from finnhub_python.financials_store import FinancialsStore, flatten_financials
+from finnhub_python.ratelimit import RateLimiter
+from finnhub_python.utils import multicall
+from mock_server import MockFinnHubServer
+
+CONCEPT = 'us-gaap_Revenues'
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run(n_symbols=200, n_reports=40):
+    symbols = ['SYM{}'.format(i) for i in range(n_symbols)]
+
+    def payload(resource, params):
+        return payloads.financials_reported(params['symbol'], n_reports, params.get('freq') or 'annual')
+
+    out = {'symbols': n_symbols, 'reports': n_reports}
+    with MockFinnHubServer(payload) as server:
+        client = FinnHubClient('bench', rate_limiter=RateLimiter({'default': 10 ** 9}))
+        client.base_uri = server.base_uri
+        store = FinancialsStore(client, tempfile.mkdtemp())
+
+        def flatten_all():
+            data = multicall(client.get_stock_financials_as_reported, symbols, freq='quarterly')
+            df = flatten_financials([r for s in symbols for r in data[s]['data']])
+            return df[df['concept'] == CONCEPT]
+
+        # Let the server encode every body once before timing
+        flatten_all()
+        out['download_and_flatten_seconds'], _ = timed(flatten_all)
+        out['first_update_seconds'], _ = timed(lambda: store.update_many(symbols, freq='quarterly'))
+        out['update_nothing_new_seconds'], _ = timed(lambda: store.update_many(symbols, freq='quarterly'))
+        out['cross_section_ms'] = timed(lambda: store.cross_section(CONCEPT))[0] * 1e3
+        out['latest_ms'] = timed(lambda: store.cross_section(CONCEPT, latest=True))[0] * 1e3
+        out['one_symbol_ms'] = timed(lambda: store.read(symbols[0]))[0] * 1e3
+        client.close()
+
+    reports = [payloads.financials_reported(s, n_reports, 'quarterly') for s in symbols[:20]]
+    tracemalloc.start()
+    nested = [payloads.financials_reported(s, n_reports, 'quarterly') for s in symbols[:20]]
+    out['nested_mb_20_symbols'] = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    del nested
+    flat = flatten_financials([r for data in reports for r in data['data']])
+    out['flat_mb_20_symbols'] = float(flat.memory_usage(deep=True).sum()) / 1e6
+    return out
+
+
+def main(n_symbols=200, n_reports=40):
+    r = run(n_symbols, n_reports)
+    print('{symbols} symbols x {reports} quarterly filings'.format(**r))
+    print('download + flatten all     {:8.2f} s'.format(r['download_and_flatten_seconds']))
+    print('store, first update        {:8.2f} s'.format(r['first_update_seconds']))
+    print('store, nothing new         {:8.2f} s'.format(r['update_nothing_new_seconds']))
+    print('cross section, all periods {:8.1f} ms'.format(r['cross_section_ms']))
+    print('cross section, latest      {:8.1f} ms'.format(r['latest_ms']))
+    print('one symbol, all concepts   {:8.1f} ms'.format(r['one_symbol_ms']))
+    print('memory, 20 symbols: nested {:.1f} MB, long table {:.1f} MB'.format(
+        r['nested_mb_20_symbols'], r['flat_mb_20_symbols']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,60 @@
+"""
+Screening a universe with local indicators: vectorized over a
+CandlePanel, and one new bar through IndicatorEngine versus computing
+the whole history again. The /scan endpoints would need three calls per
+symbol at 10 calls per minute.
+
+    python benchmarks/bench_indicators.py [n_symbols] [n_bars]
+"""
+
+from __future__ import print_function
+import sys
+
+from common import best_of
+import payloads
+from finnhub_python.decorators import to_ohlcv_arrays, to_ohlcv_frame
+from finnhub_python.indicators import IndicatorEngine, compute_indicators
+from finnhub_python.panel import CandlePanel
+
+SCAN_CALLS_PER_MINUTE = 10
+
+
+def run(n_symbols=2000, n_bars=250):
+    bars = {'SYM{}'.format(i): to_ohlcv_arrays(payloads.candles(n_bars, 'SYM{}'.format(i)))
+            for i in range(n_symbols)}
+    panel = CandlePanel.from_bars(bars)
+
+    engine = IndicatorEngine()
+    seed = best_of(lambda: [engine.seed(s, b) for s, b in bars.items()], 1)
+
+    frame = to_ohlcv_frame(bars['SYM0'])
+    t = int(bars['SYM0']['t'][-1].astype('int64'))
+    updates = 10000
+
+    def update():
+        for i in range(updates):
+            engine.update('SYM0', t + 60 * (i + 1), 101.0, 99.0, 100.0)
+
+    return {
+        'symbols': n_symbols,
+        'bars': n_bars,
+        'scan_endpoints_minutes': 3.0 * n_symbols / SCAN_CALLS_PER_MINUTE,
+        'panel_screen_seconds': best_of(lambda: compute_indicators(panel), 1),
+        'engine_seed_seconds': seed,
+        'recompute_one_symbol_us': best_of(lambda: compute_indicators(frame)) * 1e6,
+        'engine_update_us': best_of(update, 1) / updates * 1e6,
+    }
+
+
+def main(n_symbols=2000, n_bars=250):
+    result = run(n_symbols, n_bars)
+    print('{symbols} symbols x {bars} bars'.format(**result))
+    print('/scan endpoints       {:10.1f} min'.format(result['scan_endpoints_minutes']))
+    print('panel screen          {:10.2f} s'.format(result['panel_screen_seconds']))
+    print('engine seed           {:10.2f} s'.format(result['engine_seed_seconds']))
+    print('new bar, recompute    {:10.1f} us'.format(result['recompute_one_symbol_us']))
+    print('new bar, engine       {:10.1f} us'.format(result['engine_update_us']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""
+Decode time of each installed json backend, and peak memory of decoding
+a large response in one go versus streaming it element by element.
+
+    python benchmarks/bench_json_decode.py [n_reports]
+"""
+
+from __future__ import print_function
+import json
+import sys
+import tracemalloc
+
+from common import best_of
+import payloads
+from finnhub_python.decoding import BACKENDS, get_loads, iter_array
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def chunked(body, size=64 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def bodies(n_reports):
+    return {
+        'financials_reported': json.dumps(payloads.financials_reported(n_reports=n_reports)).encode(),
+        'option_chain': json.dumps(payloads.option_chain(30, 200)).encode(),
+        'candles': json.dumps(payloads.candles(n_reports * 500)).encode(),
+    }
+
+
+def run(n_reports=400):
+    out = {}
+    for name, body in bodies(n_reports).items():
+        result = {'bytes': len(body)}
+        for backend in BACKENDS:
+            try:
+                loads = get_loads(backend)
+            except ImportError:
+                continue
+            result['{}_ms'.format(backend)] = best_of(lambda: loads(body)) * 1e3
+        if name != 'candles':
+            def consume():
+                for _ in iter_array(chunked(body), 'data'):
+                    pass
+            # Peaks exclude the body itself, which streaming never holds whole
+            result['stream_ms'] = best_of(consume) * 1e3
+            result['full_peak_bytes'] = peak_bytes(lambda: json.loads(body))
+            result['stream_peak_bytes'] = peak_bytes(consume)
+        out[name] = result
+    return out
+
+
+def main(n_reports=400):
+    for name, result in sorted(run(n_reports).items()):
+        print('{} ({:.1f} MB)'.format(name, result['bytes'] / 1e6))
+        for key in sorted(result):
+            if key.endswith('_ms'):
+                print('  {:20s} {:8.1f} ms'.format(key[:-3] + ' decode', result[key]))
+            elif key.endswith('_peak_bytes'):
+                print('  {:20s} {:8.1f} MB'.format(key[:-11] + ' peak', result[key] / 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,51 @@
+"""
+Compare the vectorized candle decoder against the original
+row-by-row Timestamp implementation of ohlcv_frame.
+
+    python benchmarks/bench_ohlcv_frame.py [n_bars]
+"""
+
+from __future__ import print_function
+import sys
+
+import numpy as np
+import pandas as pd
+
+from common import best_of
+from finnhub_python.decorators import to_ohlcv_arrays, to_ohlcv_frame
+
+
+def legacy_ohlcv_frame(bars):
+    df = pd.DataFrame(bars)
+    df.index = df.pop('t').apply(pd.Timestamp.fromtimestamp)
+    df = df.tz_localize('utc')
+    return df
+
+
+def make_bars(n):
+    rng = np.random.RandomState(0)
+    close = 100 + rng.randn(n).cumsum()
+    return {
+        't': (1500000000 + 60 * np.arange(n)).tolist(),
+        'o': close.tolist(),
+        'h': (close + 0.5).tolist(),
+        'l': (close - 0.5).tolist(),
+        'c': close.tolist(),
+        'v': rng.randint(100, 10000, n).tolist(),
+        's': 'ok',
+    }
+
+
+def main(n=500000):
+    bars = make_bars(n)
+    legacy = best_of(lambda: legacy_ohlcv_frame(bars))
+    frame = best_of(lambda: to_ohlcv_frame(bars))
+    arrays = best_of(lambda: to_ohlcv_arrays(bars))
+    print('{} bars'.format(n))
+    print('legacy ohlcv_frame  {:8.1f} ms'.format(legacy * 1e3))
+    print('to_ohlcv_frame      {:8.1f} ms  ({:.1f}x)'.format(frame * 1e3, legacy / frame))
+    print('to_ohlcv_arrays     {:8.1f} ms  ({:.1f}x)'.format(arrays * 1e3, legacy / arrays))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
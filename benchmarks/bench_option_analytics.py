@@ -0,0 +1,53 @@
+"""
+Chain-wide implied volatility and greeks throughput.
+
+Builds a synthetic chain priced with known volatilities, runs
+FinnHubOptionChain.analytics over it and reports contracts per second
+along with the worst repricing error, |bs_price(iv) - price|.
+
+    python benchmarks/bench_option_analytics.py [n_expiries] [n_strikes]
+"""
+
+from __future__ import print_function
+import sys
+import time
+
+import numpy as np
+
+import common  # noqa: F401, puts the repo root on sys.path
+from finnhub_python.analytics import bs_price
+from finnhub_python.options import FinnHubOptionChain
+from payloads import option_chain
+
+
+def run(n_expiries=20, n_strikes=200):
+    chain = FinnHubOptionChain(option_chain(n_expiries, n_strikes))
+    chain.to_frame()
+    start = time.perf_counter()
+    result = chain.analytics(price='lastPrice')
+    elapsed = time.perf_counter() - start
+
+    # Every contract with an iv must reprice to the price it came from;
+    # deep ITM/OTM ones can do so with an iv far from the one generated
+    price = chain.get_column('lastPrice')
+    iv = result['iv'].to_numpy()
+    repriced = bs_price(chain.underlying_price, chain.get_column('strike'),
+                        result['time_to_expiry'].to_numpy(), iv,
+                        chain.get_column('type') == 'CALL')
+    solved = ~np.isnan(iv)
+    error = float(np.max(np.abs(repriced - price)[solved], initial=0.0))
+    assert error < 1e-6, 'iv reprices {:.2e} away from the price'.format(error)
+    return {'contracts': len(result), 'solved': int(solved.sum()), 'seconds': elapsed,
+            'contracts_per_sec': len(result) / elapsed, 'max_reprice_error': error}
+
+
+def main(n_expiries=20, n_strikes=200):
+    r = run(n_expiries, n_strikes)
+    print('{} contracts ({} with an iv) in {:.1f} ms'.format(
+        r['contracts'], r['solved'], r['seconds'] * 1e3))
+    print('{:,.0f} contracts/sec'.format(r['contracts_per_sec']))
+    print('max repricing error {:.2e}'.format(r['max_reprice_error']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,92 @@
+"""
+Several worker processes calling one rate limited server, each with its
+own RateLimiter versus all sharing a SharedRateLimiter, and the same
+workers spread over a pool of api keys.
+
+    python benchmarks/bench_shared_quota.py [n_processes] [calls_per_process]
+"""
+
+from __future__ import print_function
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401, puts the repo root on sys.path
+import payloads
+from finnhub_python.client import FinnHubClient
+from finnhub_python.ratelimit import RateLimiter, SharedRateLimiter
+from finnhub_python.retry import RetryPolicy
+from mock_server import MockFinnHubServer
+
+# Server side limit, calls per second
+LIMIT = 20
+
+
+def worker(base_uri, limiter, n, out):
+    client = FinnHubClient('bench', rate_limiter=limiter, retry_policy=RetryPolicy(max_retries=0))
+    client.base_uri = base_uri
+    failed = 0
+    for i in range(n):
+        try:
+            client.get_stock_company_profile2('SYM{}'.format(i))
+        except Exception:
+            failed += 1
+    client.close()
+    out.put(failed)
+
+
+def run_workers(base_uri, make_limiter, n_processes, calls):
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(base_uri, make_limiter(), calls, out))
+             for _ in range(n_processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    failed = sum(out.get() for _ in procs)
+    for p in procs:
+        p.join()
+    return time.perf_counter() - start, failed
+
+
+def run(n_processes=4, calls=20):
+    path = os.path.join(tempfile.mkdtemp(), 'quota.sqlite')
+    total = n_processes * calls
+    out = {'processes': n_processes, 'calls': total, 'server_limit_per_sec': LIMIT}
+    scenarios = [
+        ('local', lambda: RateLimiter({'default': LIMIT}, per=1, burst=LIMIT)),
+        ('shared', lambda: SharedRateLimiter(path, {'default': LIMIT}, per=1, burst=LIMIT)),
+    ]
+    for name, make_limiter in scenarios:
+        with MockFinnHubServer(payloads.realistic_payload, rate_limit=LIMIT, window=1) as server:
+            time.sleep(1 - time.time() % 1)
+            elapsed, failed = run_workers(server.base_uri, make_limiter, n_processes, calls)
+            out[name] = {'seconds': elapsed, 'throttled_429': server.throttled, 'failed': failed}
+
+    # Without a server limit, throughput scales with the number of keys
+    for n_keys in (1, 2, 4):
+        keys = ['key{}'.format(i) for i in range(n_keys)]
+        pooled = os.path.join(tempfile.mkdtemp(), 'quota.sqlite')
+        with MockFinnHubServer(payloads.realistic_payload) as server:
+            elapsed, failed = run_workers(
+                server.base_uri,
+                lambda: SharedRateLimiter(pooled, {'default': LIMIT}, per=1, burst=1, api_keys=keys),
+                n_processes, calls)
+        out['keys_{}'.format(n_keys)] = {'seconds': elapsed, 'calls_per_sec': total / elapsed}
+    return out
+
+
+def main(n_processes=4, calls=20):
+    result = run(n_processes, calls)
+    print('{processes} processes, {calls} calls, server limit {server_limit_per_sec}/s'.format(**result))
+    for name in ('local', 'shared'):
+        print('{:8s} {seconds:6.2f} s  {throttled_429:4d} throttled  {failed:4d} failed'.format(
+            name, **result[name]))
+    for n_keys in (1, 2, 4):
+        r = result['keys_{}'.format(n_keys)]
+        print('{} key(s) {:6.2f} s  {:6.1f} calls/s'.format(n_keys, r['seconds'], r['calls_per_sec']))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
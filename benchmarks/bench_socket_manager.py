@@ -0,0 +1,55 @@
+"""
+Drive FinnHubSocketManager against the local websocket stand-in:
+shard a symbol universe, push trades, cut every connection and
+measure how long it takes until all symbols are resubscribed.
+
+    python benchmarks/bench_socket_manager.py [n_symbols] [per_connection]
+"""
+
+from __future__ import print_function
+import sys
+import time
+
+import common  # noqa: F401, puts the repo root on sys.path
+from finnhub_python.socket import FinnHubSocketManager
+from mock_server import MockFinnHubSocketServer
+
+
+def wait_for(condition, timeout=30.0):
+    start = time.perf_counter()
+    while not condition():
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError('Timed out')
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def main(n_symbols=500, per_connection=50):
+    symbols = ['SYM{}'.format(i) for i in range(n_symbols)]
+    with MockFinnHubSocketServer() as server:
+        manager = FinnHubSocketManager(symbols, token='bench', uri=server.uri,
+                                       symbols_per_connection=per_connection,
+                                       backoff_base=0.1)
+        with manager:
+            connect = wait_for(lambda: len(server.subscribed()) == n_symbols)
+
+            start = time.perf_counter()
+            for symbol in symbols:
+                server.publish(symbol, 100.0)
+            wait_for(lambda: manager.received >= n_symbols)
+            delivery = time.perf_counter() - start
+
+            server.drop_connections()
+            wait_for(lambda: not all(s.connected.is_set() for s in manager.shards))
+            recover = wait_for(lambda: len(server.subscribed()) == n_symbols and
+                               all(s.connected.is_set() for s in manager.shards))
+
+            print('{} symbols over {} connections'.format(n_symbols, len(manager.shards)))
+            print('initial subscribe   {:8.1f} ms'.format(connect * 1e3))
+            print('deliver 1 trade/sym {:8.1f} ms'.format(delivery * 1e3))
+            print('reconnect+resub     {:8.1f} ms'.format(recover * 1e3))
+            print(manager.stats()['dropped'], 'dropped')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
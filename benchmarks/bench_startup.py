@@ -0,0 +1,64 @@
+"""
+Startup cost of a short-lived worker.
+
+Each scenario runs in a fresh interpreter: bare `import finnhub_python`,
+a raw-mode client making one candle call against the local stand-in
+(no pandas), and the same call returning a DataFrame.
+
+    python benchmarks/bench_startup.py [repeat]
+"""
+
+from __future__ import print_function
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import ROOT
+from mock_server import MockFinnHubServer
+import payloads
+
+SCENARIOS = {
+    'import': 'import finnhub_python',
+    'raw_call': (
+        'from finnhub_python import FinnHubClient\n'
+        'c = FinnHubClient("bench", raw=True)\n'
+        'c.base_uri = {uri!r}\n'
+        'bars = c.get_stock_candles("AAPL", count=100)\n'
+        'assert isinstance(bars, dict)\n'
+    ),
+    'frame_call': (
+        'from finnhub_python import FinnHubClient\n'
+        'c = FinnHubClient("bench")\n'
+        'c.base_uri = {uri!r}\n'
+        'c.get_stock_candles("AAPL", count=100)\n'
+    ),
+}
+
+REPORT = '\nimport sys, json; print(json.dumps(sorted(m for m in ("pandas", "numpy", "requests") if m in sys.modules)))'
+
+
+def run(code, repeat):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times, loaded = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.check_output([sys.executable, '-c', code + REPORT], env=env)
+        times.append(time.perf_counter() - start)
+        loaded = json.loads(out.decode().strip().splitlines()[-1])
+    return min(times), loaded
+
+
+def main(repeat=5):
+    baseline, _ = run('pass', repeat)
+    with MockFinnHubServer(payloads.realistic_payload) as server:
+        print('{:12s} {:>9s}  {}'.format('scenario', 'ms', 'heavy modules loaded'))
+        print('{:12s} {:9.1f}'.format('python', baseline * 1e3))
+        for name, code in SCENARIOS.items():
+            elapsed, loaded = run(code.format(uri=server.base_uri), repeat)
+            print('{:12s} {:9.1f}  {}'.format(name, elapsed * 1e3, ', '.join(loaded) or '-'))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,26 @@
+"""
+Helpers shared by the benchmarks.
+
+Importing this module puts the repository root on sys.path, so the
+benchmarks run from a checkout without installing finnhub_python.
+Import it before anything from finnhub_python.
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def best_of(func, repeat=3):
+    """Fastest of `repeat` calls to func, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
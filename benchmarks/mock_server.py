@@ -0,0 +1,299 @@
+"""
+Local stand-ins for the FinnHub REST and websocket APIs used by the benchmarks.
+
+The REST server serves canned JSON over HTTP/1.1 with keep-alive so
+connection reuse behaves the same way it does against finnhub.io.
+The websocket server speaks just enough RFC 6455 to accept subscribe
+messages and push trades for the subscribed symbols.
+"""
+
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, ThreadingTCPServer, BaseRequestHandler
+    from urllib.parse import urlparse, parse_qs
+except ImportError:  # Py2 compat
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, ThreadingTCPServer, BaseRequestHandler
+    from urlparse import urlparse, parse_qs
+
+
+API_PREFIX = '/api/v1'
+
+
+def default_payload(resource, params):
+    return {'symbol': params.get('symbol', ''), 'resource': resource}
+
+
+class MockFinnHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        resource = parsed.path[len(API_PREFIX):]
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if server.latency:
+            time.sleep(server.latency)
+        status, remaining, reset = server.take_quota()
+        if status == 200:
+            body = server.body(resource, params)
+        else:
+            body = b'{"error":"API limit reached. Please try again later."}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Ratelimit-Remaining', str(remaining))
+        self.send_header('X-Ratelimit-Reset', str(reset))
+        if status == 429:
+            self.send_header('Retry-After', str(max(reset - int(time.time()), 1)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockFinnHubServer(ThreadingMixIn, HTTPServer):
+    """
+    REST stand-in.
+
+    :param payload: callable(resource, params) -> json serializable response
+    :param latency: float: seconds each request is held before answering
+    :param rate_limit: int: calls allowed per `window` seconds, beyond
+        which requests get a 429 until the window resets (None = unlimited)
+    :param cache_bodies: bool: encode each distinct request's payload once
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, payload=default_payload, host='127.0.0.1', port=0,
+                 latency=0.0, rate_limit=None, window=60, cache_bodies=True):
+        HTTPServer.__init__(self, (host, port), MockFinnHubHandler)
+        self.payload = payload
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.cache_bodies = cache_bodies
+        self.hits = 0
+        self.throttled = 0
+        self._bodies = {}
+        self._window_reset = int(time.time()) + window
+        self._window_calls = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def take_quota(self):
+        """(status, remaining, reset) for the next request."""
+        with self._lock:
+            self.hits += 1
+            now = time.time()
+            if now >= self._window_reset:
+                self._window_reset = int(now) + self.window
+                self._window_calls = 0
+            if self.rate_limit is None:
+                return 200, 60, self._window_reset
+            if self._window_calls >= self.rate_limit:
+                self.throttled += 1
+                return 429, 0, self._window_reset
+            self._window_calls += 1
+            return 200, self.rate_limit - self._window_calls, self._window_reset
+
+    def body(self, resource, params):
+        params = {k: v for k, v in params.items() if k != 'token'}
+        if not self.cache_bodies:
+            return json.dumps(self.payload(resource, params)).encode('utf-8')
+        key = (resource, tuple(sorted(params.items())))
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = json.dumps(self.payload(resource, params)).encode('utf-8')
+        return body
+
+    @property
+    def base_uri(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PREFIX)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+_WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class MockSocketHandler(BaseRequestHandler):
+
+    def setup(self):
+        self.symbols = set()
+        self.send_lock = threading.Lock()
+
+    def _recv_exact(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def _handshake(self):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                raise EOFError
+            request += chunk
+        headers = {}
+        for line in request.decode('latin-1').split('\r\n')[1:]:
+            if ':' in line:
+                k, v = line.split(':', 1)
+                headers[k.strip().lower()] = v.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers['sec-websocket-key'] + _WS_GUID).encode()).digest())
+        self.request.sendall(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+    def _read_frame(self):
+        b1, b2 = struct.unpack('!BB', self._recv_exact(2))
+        length = b2 & 0x7f
+        if length == 126:
+            length = struct.unpack('!H', self._recv_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self._recv_exact(8))[0]
+        mask = self._recv_exact(4) if b2 & 0x80 else b'\x00' * 4
+        payload = bytearray(self._recv_exact(length))
+        for i in range(length):
+            payload[i] ^= mask[i % 4]
+        return b1 & 0x0f, bytes(payload)
+
+    def send_frame(self, payload, opcode=0x1):
+        if not isinstance(payload, bytes):
+            payload = payload.encode('utf-8')
+        n = len(payload)
+        if n < 126:
+            header = struct.pack('!BB', 0x80 | opcode, n)
+        elif n < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+        with self.send_lock:
+            self.request.sendall(header + payload)
+
+    def handle(self):
+        try:
+            self._handshake()
+            self.server.register(self)
+            while True:
+                opcode, payload = self._read_frame()
+                if opcode == 0x8:
+                    self.send_frame(b'', opcode=0x8)
+                    return
+                if opcode == 0x9:
+                    self.send_frame(payload, opcode=0xA)
+                elif opcode == 0x1:
+                    msg = json.loads(payload.decode('utf-8'))
+                    if msg.get('type') == 'subscribe':
+                        self.symbols.add(msg['symbol'])
+                    elif msg.get('type') == 'unsubscribe':
+                        self.symbols.discard(msg['symbol'])
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.server.unregister(self)
+
+
+class MockFinnHubSocketServer(ThreadingTCPServer):
+    """
+    Websocket stand-in. `publish(symbol, price)` pushes a trade message
+    to every connection subscribed to `symbol` and `drop_connections()`
+    cuts every client off to exercise reconnect logic.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        ThreadingTCPServer.__init__(self, (host, port), MockSocketHandler)
+        self.clients = set()
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def uri(self):
+        host, port = self.server_address[:2]
+        return 'ws://{}:{}'.format(host, port)
+
+    def register(self, client):
+        with self._lock:
+            self.clients.add(client)
+            self.connections += 1
+
+    def unregister(self, client):
+        with self._lock:
+            self.clients.discard(client)
+
+    def subscribed(self):
+        with self._lock:
+            return set().union(*[c.symbols for c in self.clients]) if self.clients else set()
+
+    def publish(self, symbol, price, volume=1, ts=None):
+        if ts is None:
+            ts = int(time.time() * 1000)
+        message = json.dumps({'type': 'trade', 'data': [
+            {'s': symbol, 'p': price, 'v': volume, 't': ts}]})
+        with self._lock:
+            clients = [c for c in self.clients if symbol in c.symbols]
+        for client in clients:
+            try:
+                client.send_frame(message)
+            except OSError:
+                pass
+        return len(clients)
+
+    def drop_connections(self):
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.request.shutdown(2)
+            except OSError:
+                pass
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,143 @@
+"""
+Synthetic but realistically shaped FinnHub responses for the benchmarks.
+Everything is seeded so runs are comparable over time.
+"""
+
+import numpy as np
+import pandas as pd
+
+import common  # noqa: F401, puts the repo root on sys.path
+from finnhub_python.analytics import bs_price
+
+CONCEPTS = {
+    'bs': ['us-gaap_Assets', 'us-gaap_Liabilities', 'us-gaap_StockholdersEquity',
+           'us-gaap_CashAndCashEquivalentsAtCarryingValue', 'us-gaap_InventoryNet',
+           'us-gaap_AccountsReceivableNetCurrent', 'us-gaap_LongTermDebtNoncurrent'],
+    'ic': ['us-gaap_Revenues', 'us-gaap_CostOfRevenue', 'us-gaap_GrossProfit',
+           'us-gaap_OperatingIncomeLoss', 'us-gaap_NetIncomeLoss',
+           'us-gaap_EarningsPerShareBasic', 'us-gaap_EarningsPerShareDiluted'],
+    'cf': ['us-gaap_NetCashProvidedByUsedInOperatingActivities',
+           'us-gaap_NetCashProvidedByUsedInInvestingActivities',
+           'us-gaap_NetCashProvidedByUsedInFinancingActivities',
+           'us-gaap_PaymentsToAcquirePropertyPlantAndEquipment',
+           'us-gaap_PaymentsOfDividends'],
+}
+
+
+def _rng(symbol=''):
+    return np.random.RandomState(sum(map(ord, symbol)) % (2 ** 32))
+
+
+def candles(n=10000, symbol='', start=1500000000, step=60):
+    rng = _rng(symbol)
+    close = 100 * np.exp(np.cumsum(rng.randn(n) * 0.001))
+    spread = np.abs(rng.randn(n)) * 0.1
+    return {
+        'c': np.round(close, 4).tolist(),
+        'h': np.round(close + spread, 4).tolist(),
+        'l': np.round(close - spread, 4).tolist(),
+        'o': np.round(close + rng.randn(n) * 0.05, 4).tolist(),
+        's': 'ok',
+        't': (start + step * np.arange(n)).tolist(),
+        'v': rng.randint(100, 100000, n).tolist(),
+    }
+
+
+def option_chain(n_expiries=20, n_strikes=100, symbol='BENCH', spot=100.0,
+                 trade_date='2020-09-01'):
+    """
+    Option chain priced with Black-Scholes from a known volatility per
+    contract, reported in `impliedVolatility` as a percentage like Finnhub.
+    """
+    rng = _rng(symbol)
+    start = pd.Timestamp(trade_date)
+    strikes = np.round(np.linspace(spot * 0.5, spot * 1.5, n_strikes), 2)
+    data = []
+    for i in range(n_expiries):
+        expiry = start + pd.Timedelta(days=7 * (i + 1))
+        T = (expiry - start).days / 365.0
+        options = {}
+        for side in ('CALL', 'PUT'):
+            vols = 0.15 + 0.3 * rng.rand(n_strikes)
+            prices = bs_price(spot, strikes, T, vols, side == 'CALL')
+            half_spread = np.maximum(prices * 0.02, 0.01)
+            options[side] = [
+                {'contractName': '{}{}{}{:08d}'.format(symbol, expiry.strftime('%y%m%d'), side[0], int(k * 1000)),
+                 'contractSize': 'REGULAR', 'currency': 'USD', 'type': side, 'inTheMoney': 'FALSE',
+                 'lastTradeDateTime': trade_date + ' 15:59:59', 'expirationDate': str(expiry.date()),
+                 'strike': k, 'lastPrice': p, 'bid': max(p - h, 0), 'ask': p + h,
+                 'change': 0.0, 'changePercent': 0.0, 'volume': int(v), 'openInterest': int(oi),
+                 'impliedVolatility': vol * 100}
+                for k, p, h, vol, v, oi in zip(
+                    strikes.tolist(), prices.tolist(), half_spread.tolist(), vols.tolist(),
+                    rng.randint(0, 5000, n_strikes), rng.randint(0, 50000, n_strikes))
+            ]
+        data.append({'expirationDate': str(expiry.date()), 'impliedVolatility': 30.0,
+                     'putVolume': 0, 'callVolume': 0, 'options': options})
+    return {'code': symbol, 'exchange': 'US', 'lastTradePrice': spot,
+            'lastTradeDate': trade_date, 'data': data}
+
+
+def financials_reported(symbol='BENCH', n_reports=40, freq='quarterly'):
+    rng = _rng(symbol)
+    reports = []
+    end = pd.Timestamp('2020-06-30')
+    step = pd.DateOffset(months=3 if freq == 'quarterly' else 12)
+    for i in range(n_reports):
+        period_end = end - step * i
+        report = {}
+        for statement, concepts in CONCEPTS.items():
+            report[statement] = [
+                {'concept': c, 'label': c.split('_')[-1], 'unit': 'usd',
+                 'value': float(rng.randint(1, 10 ** 6)) * 1000}
+                for c in concepts
+            ]
+        reports.append({
+            'accessNumber': '0000{:06d}-20-{:06d}'.format(rng.randint(10 ** 6), i),
+            'symbol': symbol, 'cik': '0000320193',
+            'year': period_end.year, 'quarter': 0 if freq == 'annual' else period_end.quarter,
+            'form': '10-K' if freq == 'annual' else '10-Q',
+            'startDate': str(period_end - step), 'endDate': str(period_end),
+            'filedDate': str(period_end + pd.Timedelta(days=30)),
+            'acceptedDate': str(period_end + pd.Timedelta(days=30)),
+            'report': report,
+        })
+    return {'cik': '0000320193', 'symbol': symbol, 'data': reports}
+
+
+def earnings(symbol='BENCH', n_quarters=4, end='2020-06-30'):
+    """Quarterly EPS surprises, newest first, as /stock/earnings returns them."""
+    rng = _rng(symbol)
+    estimate = np.round(1 + rng.rand(n_quarters), 4)
+    actual = np.round(estimate + rng.randn(n_quarters) * 0.1, 4)
+    periods = [pd.Timestamp(end) - pd.offsets.QuarterEnd(i) for i in range(n_quarters)]
+    return [{'actual': float(a), 'estimate': float(e), 'period': str(p.date()), 'symbol': symbol}
+            for a, e, p in zip(actual, estimate, periods)]
+
+
+def economic_data(n=5000, code='MA-USA-656880'):
+    rng = _rng(code)
+    dates = pd.date_range('1900-01-01', periods=n, freq='W')
+    return [{'date': str(d.date()), 'value': float(v)}
+            for d, v in zip(dates, np.round(rng.randn(n).cumsum(), 3))]
+
+
+def realistic_payload(resource, params):
+    """Route a request to the matching generator."""
+    symbol = params.get('symbol', 'BENCH')
+    if resource.endswith('/candle'):
+        return candles(int(params.get('count', 10000)), symbol)
+    if resource == '/stock/option-chain':
+        return option_chain(symbol=symbol)
+    if resource == '/stock/financials-reported':
+        return financials_reported(symbol, freq=params.get('freq') or 'annual')
+    if resource == '/stock/earnings':
+        return earnings(symbol)
+    if resource == '/economic':
+        return economic_data(code=params.get('code', ''))
+    if resource == '/stock/profile2':
+        return {'country': 'US', 'currency': 'USD', 'exchange': 'NASDAQ', 'ipo': '1980-12-12',
+                'marketCapitalization': 1415993, 'name': symbol, 'phone': '14089961010',
+                'shareOutstanding': 4375.47998046875, 'ticker': symbol,
+                'weburl': 'https://www.example.com/', 'finnhubIndustry': 'Technology'}
+    return {'symbol': symbol, 'resource': resource}
@@ -0,0 +1,266 @@
+"""
+Benchmark suite run against local stand-ins of the FinnHub REST and
+websocket APIs. Results are written as JSON so they can be tracked
+over time. Runs from a checkout, finnhub_python need not be installed.
+
+    python benchmarks/run_all.py [--quick] [--output results.json] [--only name ...]
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Before finnhub_python: puts the repo root on sys.path
+from common import best_of
+from finnhub_python.bars import BarAggregator
+from finnhub_python.client import FinnHubClient
+from finnhub_python.decorators import to_ohlcv_arrays, to_ohlcv_frame, to_economic_data_frame
+from finnhub_python.options import FinnHubOptionChain
+from finnhub_python.ratelimit import RateLimiter
+from finnhub_python.socket import FinnHubSocketManager, TickRecorder
+from finnhub_python.utils import multicall
+
+import bench_candle_panel
+import bench_decode_pool
+import bench_financials_store
+import bench_indicators
+import bench_json_decode
+import bench_option_analytics
+import bench_shared_quota
+import payloads
+from mock_server import MockFinnHubServer, MockFinnHubSocketServer
+
+
+def unlimited_client(server, **kwargs):
+    client = FinnHubClient('bench', rate_limiter=RateLimiter({'default': 10 ** 9}), **kwargs)
+    client.base_uri = server.base_uri
+    return client
+
+
+def bench_call_api(quick):
+    n = 200 if quick else 1000
+    with MockFinnHubServer(payloads.realistic_payload) as server:
+        client = unlimited_client(server)
+        symbols = ['SYM{}'.format(i) for i in range(n)]
+        sequential = best_of(lambda: [client.get_stock_company_profile2(s) for s in symbols], 1)
+        results = []
+        threaded = best_of(lambda: results.append(client.get_stock_earnings_multi(symbols)), 1)
+        client.close()
+    errors = [r for r in results[-1].values() if isinstance(r, Exception)]
+    assert not errors, 'get_stock_earnings_multi failed: {!r}'.format(errors[0])
+    return {'calls': n,
+            'sequential_calls_per_sec': n / sequential,
+            'multicall_calls_per_sec': n / threaded}
+
+
+def bench_multicall_scaling(quick):
+    counts = [10, 50] if quick else [10, 50, 200, 500]
+    # Fixed so results do not depend on the host's core count
+    workers = 32
+    out = {}
+    with MockFinnHubServer(payloads.realistic_payload, latency=0.02) as server:
+        client = unlimited_client(server, pool_size=workers)
+        for n in counts:
+            symbols = ['SYM{}'.format(i) for i in range(n)]
+            elapsed = best_of(lambda: client.get_stock_candles_multi(symbols, count=500, max_workers=workers), 1)
+            out[str(n)] = {'seconds': elapsed, 'symbols_per_sec': n / elapsed}
+        client.close()
+    return out
+
+
+def bench_decode(quick):
+    n_bars = 20000 if quick else 200000
+    bars = payloads.candles(n_bars)
+    econ = payloads.economic_data(2000 if quick else 20000)
+    return {
+        'bars': n_bars,
+        'ohlcv_frame_ms': best_of(lambda: to_ohlcv_frame(bars)) * 1e3,
+        'ohlcv_arrays_ms': best_of(lambda: to_ohlcv_arrays(bars)) * 1e3,
+        'economic_rows': len(econ),
+        'economic_data_frame_ms': best_of(lambda: to_economic_data_frame(econ)) * 1e3,
+        'json_decode_candles_ms': best_of(lambda: json.loads(json.dumps(bars))) * 1e3,
+    }
+
+
+def bench_option_chain(quick):
+    n_expiries, n_strikes = (10, 50) if quick else (30, 200)
+    data = payloads.option_chain(n_expiries, n_strikes)
+    build = best_of(lambda: FinnHubOptionChain(data).to_frame())
+    chain = FinnHubOptionChain(data)
+    expiries = chain.expirations
+    strikes = chain.get_column('strike', expiries[0], 'CALL')
+    lookups = 2000
+
+    def get_options():
+        for i in range(lookups):
+            chain.get_option(expiries[i % len(expiries)], 'CALL', strikes[i % len(strikes)])
+
+    return {
+        'contracts': len(chain.to_frame()),
+        'build_to_frame_ms': build * 1e3,
+        'get_calls_all_expiries_ms': best_of(lambda: [chain.get_calls(e) for e in expiries]) * 1e3,
+        'get_option_us': best_of(get_options) / lookups * 1e6,
+        'analytics': bench_option_analytics.run(n_expiries, n_strikes),
+    }
+
+
+def bench_rate_limited(quick):
+    n = 40 if quick else 120
+    per_sec = 20
+    with MockFinnHubServer(payloads.realistic_payload, rate_limit=per_sec, window=1) as server:
+        client = FinnHubClient('bench', rate_limiter=RateLimiter({'default': per_sec * 60}, burst=per_sec))
+        client.base_uri = server.base_uri
+        errors = [0]
+
+        def call(symbol):
+            try:
+                client.get_stock_company_profile2(symbol)
+            except requests.HTTPError:
+                errors[0] += 1
+
+        start = time.perf_counter()
+        multicall(call, ['SYM{}'.format(i) for i in range(n)])
+        elapsed = time.perf_counter() - start
+        client.close()
+    return {'calls': n, 'server_limit_per_sec': per_sec, 'seconds': elapsed,
+            'throttled_429': server.throttled, 'client_errors': errors[0]}
+
+
+def bench_websocket(quick):
+    n = 20000 if quick else 200000
+    base = 1600000000000
+    messages = [json.dumps({'type': 'trade', 'data': [
+        {'s': 'SYM{}'.format(i % 50), 'p': 100.0 + i % 7, 'v': 1, 't': base + i * 10}]})
+        for i in range(n)]
+
+    agg = BarAggregator()
+
+    def aggregate():
+        for m in messages:
+            agg.on_message(m)
+
+    fname = os.path.join(tempfile.mkdtemp(), 'ticks.txt')
+    recorder = TickRecorder(fname, max_queue=n)
+
+    def record():
+        with recorder:
+            for m in messages:
+                recorder.put(m)
+
+    out = {
+        'messages': n,
+        'bar_aggregator_msgs_per_sec': n / best_of(aggregate, 1),
+        'tick_recorder_msgs_per_sec': n / best_of(record, 1),
+        'tick_recorder_dropped': recorder.dropped,
+    }
+
+    n_live = n // 10
+    with MockFinnHubSocketServer() as server:
+        manager = FinnHubSocketManager(['SYM{}'.format(i) for i in range(50)], token='bench',
+                                       uri=server.uri, symbols_per_connection=10, max_queue=n_live)
+        with manager:
+            while len(server.subscribed()) < 50:
+                time.sleep(0.01)
+            start = time.perf_counter()
+            for i in range(n_live):
+                server.publish('SYM{}'.format(i % 50), 100.0)
+            while manager.received < n_live and time.perf_counter() - start < 60:
+                time.sleep(0.001)
+            elapsed = time.perf_counter() - start
+        out['socket_manager_msgs_per_sec'] = manager.received / elapsed
+    return out
+
+
+def bench_json(quick):
+    return bench_json_decode.run(40 if quick else 400)
+
+
+def bench_panel(quick):
+    return bench_candle_panel.run(200 if quick else 2000, 500)
+
+
+def bench_shared(quick):
+    return bench_shared_quota.run(4, 10 if quick else 40)
+
+
+def bench_pool(quick):
+    return bench_decode_pool.run(20 if quick else 100)
+
+
+def bench_indicator_engine(quick):
+    return bench_indicators.run(200 if quick else 2000)
+
+
+def bench_financials(quick):
+    return bench_financials_store.run(20 if quick else 200)
+
+
+BENCHMARKS = {
+    'candle_panel': bench_panel,
+    'call_api': bench_call_api,
+    'multicall_scaling': bench_multicall_scaling,
+    'decode': bench_decode,
+    'json_decode': bench_json,
+    'option_chain': bench_option_chain,
+    'rate_limited': bench_rate_limited,
+    'shared_quota': bench_shared,
+    'decode_pool': bench_pool,
+    'indicators': bench_indicator_engine,
+    'financials_store': bench_financials,
+    'websocket': bench_websocket,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='smaller inputs for a fast run')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only or sorted(BENCHMARKS):
+        print('running {}...'.format(name), file=sys.stderr)
+        results[name] = BENCHMARKS[name](args.quick)
+
+    report = {
+        'meta': {
+            'timestamp': pd.Timestamp.now(tz='UTC').isoformat(),
+            'commit': git_commit(),
+            'quick': args.quick,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'requests': requests.__version__,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
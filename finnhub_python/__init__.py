@@ -1 +1,18 @@
-from finnhub_python.client import FinnHubClient
+"""
+Python implementation of the FinnHub API.
+
+Clients are imported on first access so `import finnhub_python`
+stays cheap; heavy dependencies load only when a feature needs them.
+"""
+
+__all__ = ['FinnHubClient', 'AsyncFinnHubClient']
+
+
+def __getattr__(name):
+    if name == 'FinnHubClient':
+        from finnhub_python.client import FinnHubClient
+        return FinnHubClient
+    if name == 'AsyncFinnHubClient':
+        from finnhub_python.async_client import AsyncFinnHubClient
+        return AsyncFinnHubClient
+    raise AttributeError("module 'finnhub_python' has no attribute {!r}".format(name))
@@ -0,0 +1,129 @@
+"""
+Vectorized Black-Scholes pricing, implied volatility and greeks.
+
+Every function works on numpy arrays (or scalars, which broadcast),
+so a whole option chain is priced in a handful of array passes.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from scipy.special import ndtr as _ndtr
+except ImportError:
+    _ndtr = None
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+DAYS_PER_YEAR = 365.0
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF. Uses scipy when installed."""
+    x = np.asarray(x, dtype='float64')
+    if _ndtr is not None:
+        return _ndtr(x)
+    # Zelen & Severo (Abramowitz and Stegun 26.2.17), |error| < 7.5e-8
+    k = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = k * (0.319381530 + k * (-0.356563782 + k * (1.781477937 + k * (-1.821255978 + k * 1.330274429))))
+    upper = norm_pdf(x) * poly
+    return np.where(x >= 0, 1.0 - upper, upper)
+
+
+def _d1_d2(S, K, T, r, q, sigma):
+    vol_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma * sigma) * T) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(S, K, T, sigma, is_call, r=0.0, q=0.0):
+    """Black-Scholes price of european options."""
+    d1, d2 = _d1_d2(S, K, T, r, q, sigma)
+    disc_s = S * np.exp(-q * T)
+    disc_k = K * np.exp(-r * T)
+    call = disc_s * norm_cdf(d1) - disc_k * norm_cdf(d2)
+    put = disc_k * norm_cdf(-d2) - disc_s * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_volatility(price, S, K, T, is_call, r=0.0, q=0.0,
+                       tol=1e-8, max_iter=100, min_vol=1e-6, max_vol=5.0):
+    """
+    Implied volatility of every option at once.
+
+    Runs Newton's method on all contracts together, falling back to
+    bisection for any contract whose Newton step leaves its bracket.
+    Contracts already converged drop out of later iterations.
+    Prices outside the no-arbitrage bounds and expired contracts give NaN.
+
+    :return: numpy.ndarray of annualized volatilities (0.25 == 25%)
+    """
+    arrays = np.broadcast_arrays(price, S, K, T, is_call, r, q)
+    shape = arrays[0].shape
+    # Flat copies, so scalars can be indexed like chains
+    price, S, K, T, is_call, r, q = [np.array(a, dtype='float64').ravel() for a in arrays]
+    is_call = is_call.astype(bool)
+    disc_s = S * np.exp(-q * T)
+    disc_k = K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(disc_s - disc_k, 0), np.maximum(disc_k - disc_s, 0))
+    upper = np.where(is_call, disc_s, disc_k)
+    with np.errstate(invalid='ignore'):
+        valid = (T > 0) & (K > 0) & (S > 0) & (price > lower) & (price < upper)
+
+    sigma = np.full(price.shape, np.nan)
+    sigma[valid] = 0.3
+    lo = np.full(price.shape, min_vol)
+    hi = np.full(price.shape, max_vol)
+    active = np.flatnonzero(valid)
+
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        s, t = sigma[active], T[active]
+        args = S[active], K[active], t, r[active], q[active]
+        d1, _ = _d1_d2(*(args + (s,)))
+        diff = bs_price(args[0], args[1], t, s, is_call[active], args[3], args[4]) - price[active]
+        vega = args[0] * np.exp(-args[4] * t) * norm_pdf(d1) * np.sqrt(t)
+
+        hi[active] = np.where(diff > 0, s, hi[active])
+        lo[active] = np.where(diff < 0, s, lo[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = s - diff / vega
+        bisect = ~((step > lo[active]) & (step < hi[active]))
+        new = np.where(bisect, 0.5 * (lo[active] + hi[active]), step)
+        # A contract that reprices within tol keeps the sigma just checked
+        priced = np.abs(diff) < tol
+        sigma[active] = np.where(priced, s, new)
+
+        converged = priced | (np.abs(new - s) < tol)
+        active = active[~converged]
+
+    return sigma.reshape(shape)
+
+
+def greeks(S, K, T, sigma, is_call, r=0.0, q=0.0):
+    """
+    Black-Scholes greeks.
+
+    :return: dict of numpy arrays: delta, gamma, vega (per 1 vol point)
+        and theta (per calendar day)
+    """
+    is_call = np.asarray(is_call, dtype=bool)
+    d1, d2 = _d1_d2(S, K, T, r, q, sigma)
+    disc_q = np.exp(-q * T)
+    disc_r = np.exp(-r * T)
+    pdf = norm_pdf(d1)
+    sqrt_t = np.sqrt(T)
+
+    delta = np.where(is_call, disc_q * norm_cdf(d1), -disc_q * norm_cdf(-d1))
+    gamma = disc_q * pdf / (S * sigma * sqrt_t)
+    vega = S * disc_q * pdf * sqrt_t / 100.0
+    decay = -S * disc_q * pdf * sigma / (2 * sqrt_t)
+    call_theta = decay - r * K * disc_r * norm_cdf(d2) + q * S * disc_q * norm_cdf(d1)
+    put_theta = decay + r * K * disc_r * norm_cdf(-d2) - q * S * disc_q * norm_cdf(-d1)
+    theta = np.where(is_call, call_theta, put_theta) / DAYS_PER_YEAR
+    return {'delta': delta, 'gamma': gamma, 'vega': vega, 'theta': theta}
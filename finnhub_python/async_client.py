@@ -0,0 +1,313 @@
+import asyncio
+import functools
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from finnhub_python import base
+from finnhub_python.base import FinnHubBase
+from finnhub_python.cache import cache_key
+from finnhub_python.decoding import aiter_array, aiter_members
+from finnhub_python.singleflight import AsyncSingleFlight
+from finnhub_python.utils import get_finnhub_api_key
+
+
+class AsyncFinnHubBase(FinnHubBase):
+    """
+    asyncio version of FinnHubBase.
+
+    Every endpoint inherited from FinnHubBase returns a coroutine, except
+    the streaming iter_* methods, which return async generators.
+    All requests share one aiohttp connection pool and the same
+    token bucket rate limiter as the blocking client.
+    """
+
+    def __init__(self, api_key, pool_size=None, rate_limiter=None, cache=None, metrics=None,
+                 raw=None, retry_policy=None, circuit_breaker=None):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for the async client: pip install aiohttp')
+        super(AsyncFinnHubBase, self).__init__(
+            api_key, pool_size=pool_size, rate_limiter=rate_limiter, cache=cache, metrics=metrics,
+            raw=raw, retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+
+    def __enter__(self):
+        raise TypeError('Use "async with" for {}'.format(type(self).__name__))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _make_inflight(self):
+        return AsyncSingleFlight()
+
+    def _make_session(self):
+        connector = aiohttp.TCPConnector(limit=self.POOL_SIZE)
+        timeout = aiohttp.ClientTimeout(total=self.TIMEOUT_SEC)
+        self.log.debug("Opened async HTTP session with pool size {}.".format(self.POOL_SIZE))
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Close all pooled connections."""
+        with self._session_lock:
+            session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    async def reset_session(self, pool_size=None):
+        """
+        Drop the current connection pool, optionally resizing it.
+        A fresh pool is opened on the next request.
+        """
+        await self.close()
+        if pool_size is not None:
+            self.POOL_SIZE = pool_size
+
+    async def _offload(self, func, *args, **kwargs):
+        """
+        Call func, in a worker thread when the rate limiter blocks on
+        a store shared with other processes, so the event loop never
+        waits on its lock.
+        """
+        if getattr(self.rate_limiter, 'blocking', False):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+        return func(*args, **kwargs)
+
+    async def check_limit(self, resource=''):
+        if getattr(self.rate_limiter, 'api_keys', None):
+            key, waited = await self._offload(self.rate_limiter.reserve_key, resource)
+        else:
+            key, waited = self.API_KEY, await self._offload(self.rate_limiter.reserve, resource)
+        if waited > 0:
+            self.log.info("Sleeping {:.2f} seconds for {} rate limit.".format(waited, resource))
+            await asyncio.sleep(waited)
+            self.metrics.record_limit_sleep(resource, waited)
+        return key
+
+    async def _call_ranges(self, resource, params, ranges, merge):
+        if not ranges or not self.CHUNK_RANGES:
+            return await self.call_api(resource, params)
+        parts = await asyncio.gather(*[
+            self.call_api(resource, dict(params, **{'from': start, 'to': end}))
+            for start, end in ranges
+        ])
+        if any(part is None for part in parts):
+            return None
+        return merge(parts)
+
+    async def call_api(self, resource, params=None):
+        if params is None:
+            params = {}
+        if base._stop == True:
+            exit(0)
+
+        if self.cache is not None:
+            cached = self.cache.get(resource, params)
+            if cached is not None:
+                return cached
+
+        if self.COALESCE_REQUESTS:
+            return await self._inflight.do(cache_key(resource, params), self._request, resource, params)
+        return await self._request(resource, params)
+
+    async def _with_retries(self, resource, send, reraise=False):
+        # Same loop as FinnHubBase._with_retries, awaiting instead of blocking
+        attempt = 0
+        while True:
+            self.circuit_breaker.check(resource)
+            key = await self.check_limit(resource)
+            try:
+                result = await send(key)
+            except Exception as e:
+                delay = await self._offload(self._after_failure, resource, attempt, e, key, reraise)
+                if delay is None:
+                    return None
+            else:
+                self.circuit_breaker.record_success(resource)
+                return result
+            self._before_retry(resource, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _transient_errors(self):
+        return (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+    def _http_error(self, error):
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status, error.headers
+        return None
+
+    async def _send(self, resource, params, key, raw_body=False):
+        url = '{}{}'.format(self.base_uri, resource)
+        params['token'] = key
+        # aiohttp refuses None values where requests silently drops them
+        params = {k: v for k, v in params.items() if v is not None}
+
+        self.log.debug("Call URL: {} | Params: {}".format(url, params))
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        async with self.session.get(url, params=params) as r:
+            body = await r.read()
+            if metrics.enabled:
+                metrics.record_request(resource, time.perf_counter() - start,
+                                       r.status, len(body))
+            await self._offload(self.remember_headers, r.headers, resource, key)
+            r.raise_for_status()
+            if raw_body:
+                return body
+            start = time.perf_counter()
+            result = self.json_loads(body)
+            if metrics.enabled:
+                metrics.record_decode(resource, time.perf_counter() - start)
+        if self.cache is not None:
+            self.cache.set(resource, params, result)
+        return result
+
+
+    async def stream_api(self, resource, params=None, key='data', meta=None):
+        """
+        Async generator over the elements of the array `key` of a
+        response, decoded one element at a time while the body is
+        downloaded. Use with "async for".
+        Streamed calls bypass the response cache and request coalescing.
+
+        :param key: top level field holding the array, None when the
+            response is the array itself.
+        :param meta: optional dict receiving the other top level fields.
+        """
+        async for element in aiter_array(self._stream_body(resource, params), key=key, meta=meta):
+            yield element
+
+    async def stream_members(self, resource, params=None):
+        """
+        Async generator over the (field, value) pairs of a response
+        object, decoded one field at a time while the body is downloaded.
+        """
+        async for member in aiter_members(self._stream_body(resource, params)):
+            yield member
+
+    async def _stream_body(self, resource, params):
+        if base._stop == True:
+            exit(0)
+        params = dict(params or {})
+        metrics = self.metrics
+        start = time.perf_counter()
+        r = await self._with_retries(
+            resource, lambda key: self._open_stream(resource, params, key), reraise=True)
+        nbytes = 0
+        try:
+            async for chunk in r.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                nbytes += len(chunk)
+                yield chunk
+        except Exception as e:
+            metrics.record_error(resource, e)
+            raise
+        finally:
+            r.release()
+            if metrics.enabled:
+                metrics.record_request(resource, time.perf_counter() - start,
+                                       r.status, nbytes)
+
+    async def _open_stream(self, resource, params, key):
+        url = '{}{}'.format(self.base_uri, resource)
+        params = {k: v for k, v in params.items() if v is not None}
+        params['token'] = key
+
+        self.log.debug("Stream URL: {} | Params: {}".format(url, params))
+
+        # The session's total timeout would cut long downloads: as with
+        # the blocking client, only a stalled connection times out
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.TIMEOUT_SEC,
+                                        sock_read=self.TIMEOUT_SEC)
+        r = await self.session.get(url, params=params, timeout=timeout)
+        await self._offload(self.remember_headers, r.headers, resource, key)
+        try:
+            r.raise_for_status()
+        except Exception:
+            r.release()
+            raise
+        return r
+
+async def async_multicall(func, params, *args, **kwargs):
+    """
+    Awaits the same api coroutine for several parameters
+    concurrently on the running event loop.
+
+    Calls that raise map to the exception instead of a result,
+    as in multicall.
+
+    :returns dictionary
+        {parameter: api result or exception}
+    """
+    params = list(params)
+    results = await asyncio.gather(*[func(p, *args, **kwargs) for p in params],
+                                   return_exceptions=True)
+    return dict(zip(params, results))
+
+
+class AsyncFinnHubClient(AsyncFinnHubBase):
+
+    def __init__(self, api_key=None, env=None, pool_size=None, rate_limiter=None, cache=None,
+                 metrics=None, raw=None, retry_policy=None, circuit_breaker=None):
+        if api_key is None:
+            api_key = get_finnhub_api_key(env=env)
+        super(AsyncFinnHubClient, self).__init__(
+            api_key=api_key, pool_size=pool_size, rate_limiter=rate_limiter, cache=cache,
+            metrics=metrics, raw=raw, retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+
+    async def get_stock_option_chain(self, symbol):
+        opts = await super(AsyncFinnHubClient, self).get_stock_option_chain(symbol)
+        if self.RAW:
+            return opts
+        from finnhub_python.options import FinnHubOptionChain
+        return FinnHubOptionChain(opts)
+
+    async def get_stock_option_chain_multi(self, symbols):
+        return await async_multicall(
+            self.get_stock_option_chain,
+            symbols
+        )
+
+    async def get_stock_earnings(self, symbol):
+        earnings = await super(AsyncFinnHubClient, self).get_stock_earnings(symbol)
+        if self.RAW:
+            return earnings
+        import pandas as pd
+        df = pd.DataFrame(earnings)
+        df.index = df.pop('period')
+        return df.sort_index()
+
+    async def get_stock_earnings_multi(self, symbols):
+        return await async_multicall(
+            self.get_stock_earnings,
+            symbols
+        )
+
+    async def get_stock_candles_multi(self, symbols, resolution='D', count=250, panel=False):
+        """
+        With panel=True the candles are returned as a CandlePanel,
+        every symbol aligned on one UTC time index.
+        """
+        if not panel:
+            return await async_multicall(
+                self.get_stock_candles,
+                symbols,
+                resolution=resolution,
+                count=count,
+            )
+        symbols = list(symbols)
+        bars = await async_multicall(
+            self.get_stock_candles,
+            symbols,
+            resolution=resolution,
+            count=count,
+            as_arrays=True,
+        )
+        from finnhub_python.panel import CandlePanel
+        return CandlePanel.from_bars(bars, symbols)
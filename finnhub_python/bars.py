@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import deque, namedtuple
+
+from finnhub_python.chunking import RESOLUTION_SECONDS
+from finnhub_python.decorators import to_ohlcv_frame
+
+# A finished bar. `t` is the bar's start time in UNIX seconds and the
+# remaining fields match the columns produced by ohlcv_frame.
+Bar = namedtuple('Bar', ['symbol', 'resolution', 't', 'o', 'h', 'l', 'c', 'v'])
+
+BAR_RESOLUTIONS = ('1', '5', '15', '30', '60', 'D')
+
+
+class BarAggregator(object):
+    """
+    Builds OHLCV bars from websocket trade messages as they arrive.
+
+    Each trade updates the open bar of every resolution for its symbol
+    in constant time. When a trade lands past the end of a bar, that bar
+    is closed, passed to `on_bar` and queued for `closed_bars()`. Bars
+    are aligned to UTC, daily bars run from midnight to midnight UTC.
+    Trades older than the open bar are counted in `late_trades` and skipped.
+
+    :param resolutions: iterable of '1', '5', '15', '30', '60' and 'D'
+    :param on_bar: callable(Bar) called for every closed bar
+    :param history: int: closed bars kept per (symbol, resolution) for to_frame
+    """
+
+    def __init__(self, resolutions=('1', '5', '15', '60', 'D'), on_bar=None, history=1000):
+        for res in resolutions:
+            if str(res) not in BAR_RESOLUTIONS:
+                raise ValueError('Invalid resolution {}. valid = {}'.format(res, BAR_RESOLUTIONS))
+        self.resolutions = [(str(r), RESOLUTION_SECONDS[str(r)]) for r in resolutions]
+        self.on_bar = on_bar
+        self.history = history
+        self.late_trades = 0
+        self._open = {}
+        self._closed = {}
+        self._queue = deque(maxlen=history * 100)
+        self._lock = threading.Lock()
+
+    def on_message(self, message):
+        """Feed a raw websocket message. Non-trade messages are ignored."""
+        msg = json.loads(message)
+        if msg.get('type') != 'trade':
+            return
+        for trade in msg.get('data', ()):
+            self.update(trade['s'], trade['p'], trade.get('v', 0), trade['t'] / 1000.0)
+
+    def update(self, symbol, price, volume, ts):
+        """
+        Add one trade.
+
+        :param ts: float: trade time in UNIX seconds
+        """
+        closed = []
+        with self._lock:
+            for res, seconds in self.resolutions:
+                key = (symbol, res)
+                start = int(ts // seconds) * seconds
+                bar = self._open.get(key)
+                if bar is not None and start > bar[0]:
+                    closed.append(self._close(key, bar))
+                    bar = None
+                if bar is None:
+                    self._open[key] = [start, price, price, price, price, volume]
+                elif start < bar[0]:
+                    self.late_trades += 1
+                else:
+                    if price > bar[2]:
+                        bar[2] = price
+                    if price < bar[3]:
+                        bar[3] = price
+                    bar[4] = price
+                    bar[5] += volume
+        self._emit(closed)
+
+    def flush(self, now):
+        """
+        Close every open bar whose period ended before `now` (UNIX seconds).
+        Call periodically so quiet symbols still produce their bars.
+        """
+        closed = []
+        with self._lock:
+            for res, seconds in self.resolutions:
+                for key in [k for k, bar in self._open.items()
+                            if k[1] == res and bar[0] + seconds <= now]:
+                    closed.append(self._close(key, self._open[key]))
+        self._emit(closed)
+
+    def _close(self, key, bar):
+        del self._open[key]
+        closed = Bar(key[0], key[1], *bar)
+        if key not in self._closed:
+            self._closed[key] = deque(maxlen=self.history)
+        self._closed[key].append(closed)
+        self._queue.append(closed)
+        return closed
+
+    def _emit(self, closed):
+        if self.on_bar is not None:
+            for bar in closed:
+                self.on_bar(bar)
+
+    def current(self, symbol, resolution):
+        """The bar still being built for a symbol, or None."""
+        with self._lock:
+            return self._current(symbol, str(resolution))
+
+    def _current(self, symbol, resolution):
+        bar = self._open.get((symbol, resolution))
+        if bar is None:
+            return None
+        return Bar(symbol, resolution, *bar)
+
+    def closed_bars(self):
+        """Iterate over and remove the closed bars not consumed yet."""
+        while True:
+            try:
+                yield self._queue.popleft()
+            except IndexError:
+                return
+
+    def to_frame(self, symbol, resolution, include_open=False):
+        """Recent closed bars as a DataFrame with the ohlcv_frame schema."""
+        resolution = str(resolution)
+        with self._lock:
+            bars = list(self._closed.get((symbol, resolution), ()))
+            current = self._current(symbol, resolution) if include_open else None
+        if current is not None:
+            bars.append(current)
+        # Same keys, in the same order, as a candle response
+        columns = {field: [float(getattr(bar, field)) for bar in bars] for field in ('c', 'h', 'l', 'o')}
+        columns['s'] = 'ok'
+        columns['t'] = [bar.t for bar in bars]
+        columns['v'] = [bar.v for bar in bars]
+        return to_ohlcv_frame(columns)
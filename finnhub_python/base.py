@@ -1,12 +1,18 @@
-import requests
 import signal
 import logging
+import threading
 import time
 import os
-import pandas as pd
 
 from finnhub_python.decorators import ohlcv_frame, economic_data_frame
-from finnhub_python.utils import get_formatted_dates
+from finnhub_python.cache import cache_key
+from finnhub_python.chunking import candle_ranges, date_ranges, merge_candles, merge_records
+from finnhub_python.decoding import get_loads, iter_array, iter_members
+from finnhub_python.metrics import NullMetrics
+from finnhub_python.ratelimit import RateLimiter
+from finnhub_python.retry import CircuitBreaker, RetryPolicy
+from finnhub_python.singleflight import SingleFlight
+from finnhub_python.utils import get_formatted_dates, multicall, MAX_THREADS
 
 # Globals
 LOG_LEVEL = int(os.environ.get('LOG_LEVEL', logging.WARNING))
@@ -29,10 +35,43 @@ class FinnHubBase(object):
     # If your limit is exceeded, you will receive a response with status code 429.
     LAST_HEADERS = None
 
+    # Calls per minute admitted by the client side rate limiter,
+    # keyed by resource prefix.
+    RATE_LIMITS = {'default': 60, '/scan': 10}
+
+    # Largest burst of back to back calls the rate limiter allows
+    # before spacing requests out at the per minute rate.
+    RATE_LIMIT_BURST = 10
+
+    # Concurrent calls with the same resource and params wait on
+    # a single request and share its result.
+    COALESCE_REQUESTS = True
+
+    # Long ranges given to the candle by timerange, company news, filings
+    # and splits methods are split into several requests fetched concurrently.
+    # Range sizes per endpoint are set in finnhub_python.chunking.
+    CHUNK_RANGES = True
+
+    # When True, methods that normally return pandas objects return the
+    # decoded json payload instead, so pandas is never imported.
+    RAW = False
+
+    # json library used to decode responses: 'orjson', 'ujson' or 'json'.
+    # None picks the fastest one installed.
+    JSON_BACKEND = None
+
+    # Bytes read off the socket at a time by the streaming methods
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     # Define a timeout in seconds for every request
     TIMEOUT_SEC = 5
 
-    def __init__(self, api_key):
+    # Number of keep-alive connections held open to finnhub.io.
+    # Defaults to the number of threads multicall runs at once.
+    POOL_SIZE = MAX_THREADS
+
+    def __init__(self, api_key, pool_size=None, rate_limiter=None, cache=None, metrics=None,
+                 raw=None, retry_policy=None, circuit_breaker=None):
         def signal_handler(signal, frame):
             global _stop
             print('Stopping Crawler...')
@@ -44,6 +83,78 @@ class FinnHubBase(object):
         self.log = logging.getLogger(__name__)
         self.log.debug("Initializing FinnHub API with API-Key {}.".format(api_key))
         self.API_KEY = api_key
+        if pool_size is not None:
+            self.POOL_SIZE = pool_size
+        if raw is not None:
+            self.RAW = raw
+        self._session = None
+        self._session_lock = threading.Lock()
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(self.RATE_LIMITS, burst=self.RATE_LIMIT_BURST)
+        self.rate_limiter = rate_limiter
+        # Retries of connection errors, timeouts, 429 and 5xx responses
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Fails calls fast while an endpoint keeps failing
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        # Optional ResponseCache consulted before any request is sent
+        self.cache = cache
+        self._inflight = self._make_inflight()
+        # Metrics instance recording per-resource timings and counts
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        # Decodes response bodies, any callable taking bytes will do
+        self.json_loads = get_loads(self.JSON_BACKEND)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        Pooled keep-alive session shared by every call_api request.
+        Created on first use so the TCP/TLS handshake is only paid
+        once per pooled connection instead of once per request.
+        """
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._make_session()
+            return self._session
+
+    def _make_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.POOL_SIZE,
+            pool_block=True,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.log.debug("Opened HTTP session with pool size {}.".format(self.POOL_SIZE))
+        return session
+
+    def close(self):
+        """Close all pooled connections."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _make_inflight(self):
+        return SingleFlight()
+
+    def reset_session(self, pool_size=None):
+        """
+        Drop the current connection pool, optionally resizing it.
+        A fresh pool is opened on the next request.
+        """
+        self.close()
+        if pool_size is not None:
+            self.POOL_SIZE = pool_size
 
     def get_stock_company_profile(self, symbol=None, isin=None, cusip=None):
         """Get general information of a company."""
@@ -67,7 +178,9 @@ class FinnHubBase(object):
 
         params = {'symbol': symbol, 'cik': cik, 'accessNumber': access_number,
                   'form': form, 'from': start, 'to': end}
-        return self.call_api('/stock/filings', params=params)
+        return self._call_ranges(
+            '/stock/filings', params, date_ranges('/stock/filings', start, end),
+            lambda parts: merge_records(parts, 'accessNumber', newest_first=True))
 
     def get_stock_ceo_compensation(self, symbol):
         """Get latest company's CEO compensation.
@@ -95,6 +208,16 @@ class FinnHubBase(object):
         params = {'symbol': symbol}
         return self.call_api('/stock/option-chain', params)
 
+    def iter_stock_option_chain(self, symbol, meta=None):
+        """
+        Yields the option chain one expiration date at a time
+        as it is read off the connection.
+        :param meta: optional dict receiving the other response fields
+            (code, exchange, lastTradePrice, lastTradeDate).
+        """
+        params = {'symbol': symbol}
+        return self.stream_api('/stock/option-chain', params, meta=meta)
+
     def get_stock_peers(self, symbol):
         """Get company peers."""
 
@@ -117,6 +240,16 @@ class FinnHubBase(object):
         params = {'symbol': symbol, 'cik': cik, 'accessNumber': access_number, 'freq': freq}
         return self.call_api('/stock/financials-reported', params=params)
 
+    def iter_stock_financials_as_reported(self, symbol, cik=None, access_number=None, freq=None,
+                                          meta=None):
+        """
+        Same as get_stock_financials_as_reported, but yields the reports
+        one at a time as they are read off the connection.
+        :param meta: optional dict receiving the other response fields (cik, symbol).
+        """
+        params = {'symbol': symbol, 'cik': cik, 'accessNumber': access_number, 'freq': freq}
+        return self.stream_api('/stock/financials-reported', params, meta=meta)
+
     def get_stock_earnings(self, symbol):
         """Get company quarterly earnings."""
 
@@ -130,7 +263,9 @@ class FinnHubBase(object):
             lookback_days=lookback_days
         )
         params = {'symbol': symbol, 'from': start, 'to': end}
-        return self.call_api('/stock/split', params=params)
+        return self._call_ranges(
+            '/stock/split', params, date_ranges('/stock/split', start, end),
+            lambda parts: merge_records(parts, 'date'))
 
     @ohlcv_frame
     def get_stock_candles(self, symbol, resolution="D", count=200, format="json"):
@@ -144,7 +279,8 @@ class FinnHubBase(object):
         """Get candlestick data for stocks."""
 
         params = {'symbol': symbol, 'resolution': resolution, 'from': start, 'to': end, 'format': format}
-        return self.call_api('/stock/candle', params)
+        ranges = candle_ranges(resolution, start, end) if format == 'json' else None
+        return self._call_ranges('/stock/candle', params, ranges, merge_candles)
 
     def get_crypto_exchanges(self):
         return self.call_api('/crypto/exchange')
@@ -184,6 +320,14 @@ class FinnHubBase(object):
         bars = self.call_api('/crypto/candle', params)
         return bars
 
+    @ohlcv_frame
+    def get_crypto_candles_by_timerange(self, symbol, resolution="D", start="", end="", format="json"):
+        """Get candlestick data for crypto."""
+
+        params = {'symbol': symbol, 'resolution': resolution, 'from': start, 'to': end, 'format': format}
+        ranges = candle_ranges(resolution, start, end) if format == 'json' else None
+        return self._call_ranges('/crypto/candle', params, ranges, merge_candles)
+
     def get_forex_exchanges(self):
         """List supported forex exchanges"""
 
@@ -211,7 +355,8 @@ class FinnHubBase(object):
         """Get candlestick data for forex."""
 
         params = {'symbol': symbol, 'resolution': resolution, 'from': start, 'to': end, 'format': format}
-        return self.call_api('/forex/candle', params)
+        ranges = candle_ranges(resolution, start, end) if format == 'json' else None
+        return self._call_ranges('/forex/candle', params, ranges, merge_candles)
 
     def get_patterns(self, symbol, resolution="D"):
         """Run pattern recognition algorithm on a symbol.
@@ -241,15 +386,14 @@ class FinnHubBase(object):
         return self.call_api('/news', params)
 
     def get_company_news(self, symbol, start_date=None, end_date=None, lookback_days=7):
-        if end_date is None:
-            end_date = pd.Timestamp.utcnow()
-        if start_date is None:
-            start_date = pd.Timestamp(end_date) - pd.Timedelta(days=lookback_days)
-        # Ensure proper date string parameters
-        start_date = pd.Timestamp(start_date).strftime('%Y-%m-%d')
-        end_date = pd.Timestamp(end_date).strftime('%Y-%m-%d')
+        start_date, end_date = get_formatted_dates(
+            start_date=start_date,
+            end_date=end_date,
+            lookback_days=lookback_days)
         params = {'symbol': symbol, 'from': start_date, 'to': end_date}
-        return self.call_api('/company-news', params=params)
+        return self._call_ranges(
+            '/company-news', params, date_ranges('/company-news', start_date, end_date),
+            lambda parts: merge_records(parts, 'id', newest_first=True))
 
     def get_news_sentiment(self, symbol):
         """Get company's news sentiment and statistics."""
@@ -302,25 +446,25 @@ class FinnHubBase(object):
     def get_covid19_data(self):
         return self.call_api('/covid19/us')
 
-    def remember_headers(self, headers):
+    def remember_headers(self, headers, resource='', key=None):
         self.LAST_HEADERS = headers
+        self.rate_limiter.sync(resource, headers, key=key)
 
-    def check_limit(self):
-        if self.LAST_HEADERS == None:
-            self.log.info("LAST_HEADERS is None. OK!")
-            return
-
-        headers = self.LAST_HEADERS
-        current_ts = int(time.time())
-        reset_ts = int(headers['X-Ratelimit-Reset'])
-        remaining_calls = int(headers['X-Ratelimit-Remaining'])
-        seconds_until_reset = reset_ts - current_ts
-
-        self.log.info("Remaining Call: {} | Seconds until reset: {}".format(remaining_calls, seconds_until_reset))
-
-        if remaining_calls == 0:
-            self.log.info("Sleeping for {} seconds until next call.".format(seconds_until_reset))
-            time.sleep(seconds_until_reset + 2)
+    def check_limit(self, resource=''):
+        """
+        Wait for a slot in the rate limit budget of `resource`.
+        Shared by every thread using this client.
+        Returns the api key to send, picked by the rate limiter when
+        it holds a pool of keys.
+        """
+        if getattr(self.rate_limiter, 'api_keys', None):
+            key, waited = self.rate_limiter.acquire_key(resource)
+        else:
+            key, waited = self.API_KEY, self.rate_limiter.acquire(resource)
+        if waited > 0:
+            self.log.info("Slept {:.2f} seconds for {} rate limit.".format(waited, resource))
+            self.metrics.record_limit_sleep(resource, waited)
+        return key
 
     def call_api(self, resource, params=None):
         if params is None:
@@ -328,22 +472,232 @@ class FinnHubBase(object):
         if _stop == True:
             exit(0)
 
-        self.check_limit()
+        if self.cache is not None:
+            cached = self.cache.get(resource, params)
+            if cached is not None:
+                return cached
+
+        if self.COALESCE_REQUESTS:
+            return self._inflight.do(cache_key(resource, params), self._request, resource, params)
+        return self._request(resource, params)
+
+    def fetch_body(self, resource, params=None):
+        """
+        Undecoded response body of a request, sent with the same rate
+        limiting and retries as call_api, for decoding elsewhere (see
+        finnhub_python.decode_pool). Bodies are never cached or shared
+        between concurrent callers. None when the request failed.
+        """
+        if _stop == True:
+            exit(0)
+        return self._request(resource, dict(params or {}), raw_body=True)
+
+    def _request(self, resource, params, raw_body=False):
+        return self._with_retries(
+            resource, lambda key: self._send(resource, params, key, raw_body))
+
+    def _with_retries(self, resource, send, reraise=False):
+        """
+        Call send(api key) under the rate limit, circuit breaker and
+        retry policy. Returns None when the last attempt failed with a
+        connection error or timeout, unless `reraise` is set.
+        """
+        attempt = 0
+        while True:
+            self.circuit_breaker.check(resource)
+            key = self.check_limit(resource)
+            try:
+                result = send(key)
+            except Exception as e:
+                delay = self._after_failure(resource, attempt, e, key, reraise)
+                if delay is None:
+                    return None
+            else:
+                self.circuit_breaker.record_success(resource)
+                return result
+            self._before_retry(resource, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _transient_errors(self):
+        """Exceptions of a request that may succeed if sent again."""
+        import requests
+
+        return (ConnectionError, TimeoutError, requests.ConnectionError,
+                requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+    def _http_error(self, error):
+        """(status, headers) of an HTTP error response, or None for other errors."""
+        import requests
+
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code, error.response.headers
+        return None
+
+    def _after_failure(self, resource, attempt, error, key, reraise=False):
+        """
+        Decide what follows a failed attempt, for the blocking and async
+        request loops alike. Returns the seconds to wait before retrying,
+        or None to give up with a None result (a transient error, unless
+        `reraise` is set). Re-raises `error` for every other outcome.
+        """
+        http = self._http_error(error)
+        if http is not None:
+            delay = self._retry_delay(resource, attempt, error, http[0], http[1], key)
+        elif isinstance(error, self._transient_errors()):
+            delay = self._retry_delay(resource, attempt, error, key=key)
+            if delay is None:
+                self.remember_headers(None, resource, key)
+                if not reraise:
+                    # exc_info from the error, this may run in a worker thread
+                    self.log.error(error, exc_info=error)
+                    return None
+        else:
+            self.metrics.record_error(resource, error)
+            self.circuit_breaker.record_failure(resource)
+            delay = None
+        if delay is None:
+            raise error
+        return delay
+
+    def _before_retry(self, resource, delay):
+        self.log.info("Retrying {} in {:.2f} seconds.".format(resource, delay))
+        self.metrics.record_retry(resource, delay)
+
+    def _send(self, resource, params, key, raw_body=False):
         url = '{}{}'.format(self.base_uri, resource)
-        params['token'] = self.API_KEY
+        params['token'] = key
 
         self.log.debug("Call URL: {} | Params: {}".format(url, params))
 
-        result = None
+        metrics = self.metrics
+        start = time.perf_counter()
+        r = self.session.get(url, params=params, timeout=self.TIMEOUT_SEC)
+        if metrics.enabled:
+            metrics.record_request(resource, time.perf_counter() - start,
+                                   r.status_code, len(r.content))
+        self.remember_headers(r.headers, resource, key)
+        r.raise_for_status()
+        if raw_body:
+            return r.content
+        start = time.perf_counter()
+        result = self.json_loads(r.content)
+        if metrics.enabled:
+            metrics.record_decode(resource, time.perf_counter() - start)
+        if self.cache is not None:
+            self.cache.set(resource, params, result)
+        return result
 
+    def _retry_delay(self, resource, attempt, error, status=None, headers=None, key=None):
+        """
+        Record a failed attempt and return the seconds to wait before
+        sending it again, or None to give up.
+        """
+        self.metrics.record_error(resource, error)
+        policy = self.retry_policy
+        if status == 429 or (status is not None and not policy.retries_status(status)):
+            # The endpoint answered: it is up even if the call was refused
+            self.circuit_breaker.record_success(resource)
+            if status != 429:
+                return None
+        else:
+            self.circuit_breaker.record_failure(resource)
+        if attempt >= policy.max_retries or self.circuit_breaker.state(resource) != 'closed':
+            # Out of retries, or this failure opened the circuit
+            return None
+        wait = policy.server_wait(headers)
+        if wait is None:
+            return policy.backoff(attempt)
+        if status == 429:
+            # Hold back every caller of the resource until the quota resets,
+            # check_limit then readmits them one at a time instead of together
+            self.rate_limiter.block(resource, time.time() + wait, key=key)
+            return policy.jitter()
+        return wait + policy.jitter()
+
+    def _call_ranges(self, resource, params, ranges, merge):
+        """
+        call_api once per (from, to) range in `ranges`, concurrently,
+        and merge the responses in range order with `merge`.
+        A single request is sent when ranges is None or CHUNK_RANGES is off.
+        Fails like a single request would if any range fails.
+        """
+        if not ranges or not self.CHUNK_RANGES:
+            return self.call_api(resource, params)
+
+        def fetch(date_range):
+            return self.call_api(resource, dict(params, **{'from': date_range[0], 'to': date_range[1]}))
+
+        self.log.debug("Splitting {} into {} requests.".format(resource, len(ranges)))
+        results = multicall(fetch, ranges, max_workers=min(len(ranges), self.POOL_SIZE))
+        parts = []
+        for date_range in ranges:
+            result = results[date_range]
+            if isinstance(result, Exception):
+                raise result
+            if result is None:
+                return None
+            parts.append(result)
+        return merge(parts)
+
+    def stream_api(self, resource, params=None, key='data', meta=None):
+        """
+        Generator over the elements of the array `key` of a response,
+        decoded one element at a time while the body is downloaded, so a
+        large response is never held in memory as a whole.
+        Streamed calls bypass the response cache and request coalescing.
+
+        :param key: top level field holding the array, None when the
+            response is the array itself.
+        :param meta: optional dict receiving the other top level fields.
+        """
+        return iter_array(self._stream_body(resource, params), key=key, meta=meta)
+
+    def stream_members(self, resource, params=None):
+        """
+        Generator over the (field, value) pairs of a response object,
+        decoded one field at a time while the body is downloaded.
+        """
+        return iter_members(self._stream_body(resource, params))
+
+    def _stream_body(self, resource, params):
+        """
+        Generator over the chunks of a response body. The request is sent
+        with the retries of call_api; once the body has started, errors
+        are raised as they cannot be retried without repeating chunks.
+        """
+        if _stop == True:
+            exit(0)
+        params = dict(params or {})
+        metrics = self.metrics
+        start = time.perf_counter()
+        r = self._with_retries(
+            resource, lambda key: self._open_stream(resource, params, key), reraise=True)
+        nbytes = 0
         try:
-            r = requests.get(url, params=params, timeout=self.TIMEOUT_SEC)
-            r.raise_for_status()
-            self.remember_headers(r.headers)
-            result = r.json()
-        except (ConnectionError, TimeoutError) as e:
-            self.log.exception(e)
-            self.remember_headers(None)
-            result = None
+            with r:
+                for chunk in r.iter_content(self.STREAM_CHUNK_SIZE):
+                    nbytes += len(chunk)
+                    yield chunk
+        except Exception as e:
+            metrics.record_error(resource, e)
+            raise
+        finally:
+            if metrics.enabled:
+                metrics.record_request(resource, time.perf_counter() - start,
+                                       r.status_code, nbytes)
+
+    def _open_stream(self, resource, params, key):
+        url = '{}{}'.format(self.base_uri, resource)
+        params = dict(params, token=key)
 
-        return result
+        self.log.debug("Stream URL: {} | Params: {}".format(url, params))
+
+        r = self.session.get(url, params=params, timeout=self.TIMEOUT_SEC, stream=True)
+        self.remember_headers(r.headers, resource, key)
+        try:
+            r.raise_for_status()
+        except Exception:
+            r.close()
+            raise
+        return r
@@ -0,0 +1,194 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# Seconds to keep responses from endpoints whose data rarely changes.
+# Endpoints not listed here are never cached.
+DEFAULT_TTLS = {
+    '/stock/profile2': 24 * 60 * 60,
+    '/stock/peers': 24 * 60 * 60,
+    '/crypto/symbol': 24 * 60 * 60,
+    '/forex/symbol': 24 * 60 * 60,
+    '/economic/code': 7 * 24 * 60 * 60,
+    '/merger/country': 7 * 24 * 60 * 60,
+}
+
+_MISSING = object()
+
+
+def cache_key(resource, params=None):
+    """
+    Key for a request: the resource plus its parameters, sorted,
+    with empty values and the api token left out.
+    """
+    params = params or {}
+    items = sorted(
+        (k, str(v)) for k, v in params.items()
+        if k != 'token' and v is not None
+    )
+    return '{}?{}'.format(resource, json.dumps(items, separators=(',', ':')))
+
+
+class MemoryCache(object):
+    """
+    Thread-safe in-memory LRU backend.
+    Holds at most `maxsize` responses, evicting the least recently used.
+    Responses are copied in and out, so callers may modify what they get.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache(object):
+    """
+    SQLite backend that can be shared by several processes on one host.
+    Responses are stored as JSON and expired entries are purged lazily.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.finnhub_python', 'cache.sqlite')
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self.path = path
+        self.evictions = 0
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, expires REAL, value TEXT)')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _conn(self):
+        # Connections are per thread, and never reused in a forked child
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            'SELECT expires, value FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] < time.time():
+            return default
+        return json.loads(row[1])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?)',
+                (key, now + ttl, json.dumps(value)))
+            self.evictions += conn.execute(
+                'DELETE FROM responses WHERE expires < ?', (now,)).rowcount
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute('DELETE FROM responses')
+
+
+class ResponseCache(object):
+    """
+    TTL cache for api responses, keyed by resource and parameters.
+
+    :param backend: MemoryCache (default), DiskCache or any object
+        with the same get/set/clear methods.
+    :param ttls: dict {resource: seconds}. Defaults to DEFAULT_TTLS.
+    """
+
+    def __init__(self, backend=None, ttls=None):
+        if backend is None:
+            backend = MemoryCache()
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self.backend = backend
+        self.ttls = dict(ttls)
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def ttl(self, resource):
+        return self.ttls.get(resource, 0)
+
+    def get(self, resource, params=None):
+        """Cached response for a request, or None."""
+        if not self.ttl(resource):
+            return None
+        value = self.backend.get(cache_key(resource, params))
+        if value is None:
+            self.misses[resource] += 1
+        else:
+            self.hits[resource] += 1
+        return value
+
+    def set(self, resource, params, value):
+        ttl = self.ttl(resource)
+        if ttl and value is not None:
+            self.backend.set(cache_key(resource, params), value, ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Hit and miss counts in total and per resource."""
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / float(hits + misses) if hits + misses else 0.0,
+            'evictions': getattr(self.backend, 'evictions', 0),
+            'resources': {
+                r: {'hits': self.hits[r], 'misses': self.misses[r]}
+                for r in set(self.hits) | set(self.misses)
+            },
+        }
@@ -0,0 +1,357 @@
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from finnhub_python.chunking import RESOLUTION_SECONDS
+from finnhub_python.decorators import to_ohlcv_arrays, to_ohlcv_frame
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Client method fetching the candles of each kind between two UNIX times
+CANDLE_METHODS = {
+    'stock': 'get_stock_candles_by_timerange',
+    'forex': 'get_forex_candles_by_timerange',
+    'crypto': 'get_crypto_candles_by_timerange',
+}
+
+FIELDS = ['o', 'h', 'l', 'c', 'v']
+
+# Bars asked for when no start is given, like get_stock_candles' count
+DEFAULT_BARS = 200
+
+MANIFEST = 'series.json'
+
+
+def to_unix(ts):
+    """UNIX seconds for an int, or anything pandas.Timestamp accepts (naive means UTC)."""
+    if isinstance(ts, (int, float, np.integer, np.floating)):
+        return int(ts)
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('utc')
+    return int(ts.timestamp())
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or adjacent [start, end] ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Parts of [start, end] not inside any of the `covered` ranges."""
+    gaps = []
+    cursor = start
+    for c_start, c_end in merge_ranges(covered):
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append([cursor, c_start - 1])
+        cursor = max(cursor, c_end + 1)
+    if cursor <= end:
+        gaps.append([cursor, end])
+    return gaps
+
+
+@contextmanager
+def _file_lock(fname):
+    """Exclusive lock on the file `fname`, held against other processes too."""
+    with open(fname, 'a+b') as f:
+        f.seek(0)
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _records(columns):
+    """One structured array of bars sorted by time from {field: array}."""
+    v = np.asarray(columns['v'])
+    dtype = [('t', 'int64')] + [(f, 'float64') for f in FIELDS[:-1]]
+    # Volume stays integer when the api sent integers, as in ohlcv_frame
+    dtype.append(('v', 'int64' if v.dtype.kind in 'iub' else 'float64'))
+    out = np.empty(len(columns['t']), dtype=dtype)
+    for name in out.dtype.names:
+        out[name] = columns[name]
+    return out[np.argsort(out['t'], kind='stable')]
+
+
+def _combine(parts):
+    """
+    Join slices of segments, oldest segment first, into {field: array}
+    sorted by time. A time found in several segments keeps the newest bar.
+    """
+    if len(parts) == 1:
+        return {name: parts[0][name] for name in parts[0].dtype.names}
+    columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0].dtype.names}
+    t = columns['t']
+    if len(t) > 1 and not (t[1:] > t[:-1]).all():
+        # Segments overlap: unique keeps the first of equal times,
+        # so look at the bars newest first
+        newest_first = t[::-1]
+        order = np.argsort(newest_first, kind='stable')
+        _, first = np.unique(newest_first[order], return_index=True)
+        keep = len(t) - 1 - order[first]
+        columns = {name: values[keep] for name, values in columns.items()}
+    return columns
+
+
+class CandleStore(object):
+    """
+    Local columnar candle store keyed by (symbol, resolution).
+
+    Each series is a directory of immutable segment files, each one
+    structured .npy array of bars sorted by time, and a manifest listing
+    the segments and the time ranges already downloaded. Requests only
+    fetch the gaps from the api, and covered history is served from
+    memory-mapped segments without any api calls.
+
+    An update writes the new bars to a new segment and then replaces the
+    manifest, so readers see either all of an update or none of it.
+    Small updates only write their own bars: the newest segments are
+    merged once they are about as large as the one before them, which
+    keeps a series to a few segments. Updates of a series are serialized
+    across threads and processes by a lock file in its directory.
+
+    :param client: FinnHubClient used to fetch missing bars. The store
+        blocks on its requests, so async clients are not accepted.
+    :param path: str: root directory of the store
+    """
+
+    def __init__(self, client, path):
+        if inspect.iscoroutinefunction(client.call_api):
+            raise TypeError('CandleStore needs a blocking client such as FinnHubClient, '
+                            'not {}'.format(type(client).__name__))
+        self.client = client
+        self.path = path
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    @contextmanager
+    def _lock(self, symbol, resolution):
+        with self._locks_lock:
+            lock = self._locks.setdefault((symbol, resolution), threading.Lock())
+        dirname = self._series_dir(symbol, resolution)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        with lock, _file_lock(os.path.join(dirname, '.lock')):
+            yield
+
+    def _series_dir(self, symbol, resolution):
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', symbol)
+        return os.path.join(self.path, str(resolution), safe)
+
+    def _manifest(self, symbol, resolution):
+        fname = os.path.join(self._series_dir(symbol, resolution), MANIFEST)
+        if not os.path.exists(fname):
+            return {'segments': [], 'coverage': [], 'next': 0}
+        with open(fname, 'r') as f:
+            return json.load(f)
+
+    def _segments(self, symbol, resolution):
+        """Memory-mapped segments of a series, oldest first."""
+        dirname = self._series_dir(symbol, resolution)
+        for attempt in range(3):
+            manifest = self._manifest(symbol, resolution)
+            try:
+                return [np.load(os.path.join(dirname, name), mmap_mode='r')
+                        for name, _ in manifest['segments']]
+            except FileNotFoundError:
+                # Merged away by another process since the manifest was read
+                if attempt == 2:
+                    raise
+
+    def coverage(self, symbol, resolution='D'):
+        """List of [start, end] UNIX ranges already downloaded."""
+        return self._manifest(symbol, resolution)['coverage']
+
+    @staticmethod
+    def _range(resolution, start, end):
+        """
+        UNIX [start, end]. `end` defaults to now and `start` to
+        DEFAULT_BARS bars before `end`.
+        """
+        end = int(time.time()) if end is None else to_unix(end)
+        if start is None:
+            return end - DEFAULT_BARS * RESOLUTION_SECONDS[str(resolution)], end
+        return to_unix(start), end
+
+    def missing(self, symbol, resolution='D', start=None, end=None):
+        """List of [start, end] UNIX ranges that still need to be fetched."""
+        start, end = self._range(resolution, start, end)
+        return missing_ranges(self.coverage(symbol, resolution), start, end)
+
+    def read_arrays(self, symbol, resolution='D', start=None, end=None):
+        """
+        Stored bars in [start, end] as a candle response of numpy arrays,
+        keyed c/h/l/o/s/t/v with `t` in UNIX seconds. Arrays of a series
+        kept in one segment are read-only views of the memory-mapped file.
+        """
+        parts = []
+        for segment in self._segments(symbol, resolution):
+            t = segment['t']
+            lo = 0 if start is None else np.searchsorted(t, to_unix(start), side='left')
+            hi = len(t) if end is None else np.searchsorted(t, to_unix(end), side='right')
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        if parts:
+            columns = _combine(parts)
+        else:
+            columns = {'t': np.empty(0, dtype='int64')}
+            columns.update((field, np.empty(0)) for field in FIELDS)
+        # Same keys, in the same order, as a candle response
+        return {'c': columns['c'], 'h': columns['h'], 'l': columns['l'], 'o': columns['o'],
+                's': 'ok' if parts else 'no_data', 't': columns['t'], 'v': columns['v']}
+
+    def read(self, symbol, resolution='D', start=None, end=None):
+        """Stored bars in [start, end] as the DataFrame ohlcv_frame makes of a candle response."""
+        return to_ohlcv_frame(self.read_arrays(symbol, resolution, start, end))
+
+    def update(self, symbol, resolution='D', start=None, end=None, kind='stock'):
+        """
+        Fetch and store the bars missing from [start, end], with the
+        same defaults as get_candles.
+
+        :param kind: str: 'stock', 'forex' or 'crypto'
+        :return: int: number of api calls made
+        """
+        start, end = self._range(resolution, start, end)
+        with self._lock(symbol, resolution):
+            manifest = self._manifest(symbol, resolution)
+            covered = list(manifest['coverage'])
+            gaps = missing_ranges(covered, start, end)
+            fetched = []
+            for gap_start, gap_end in gaps:
+                bars = self._fetch(kind, symbol, resolution, gap_start, gap_end)
+                if bars is None:
+                    # Request failed, leave the gap to be fetched again
+                    continue
+                if len(bars['t']):
+                    fetched.append(bars)
+                covered_until = self._covered_until(bars, resolution, gap_start, gap_end)
+                if covered_until >= gap_start:
+                    covered.append([gap_start, covered_until])
+            if gaps:
+                self._commit(symbol, resolution, manifest, fetched, covered)
+        return len(gaps)
+
+    def get_candles(self, symbol, resolution='D', start=None, end=None, kind='stock'):
+        """
+        Candles for [start, end], downloading only what is not stored yet.
+        Defaults to `end` = now and `start` = DEFAULT_BARS bars before it.
+        """
+        start, end = self._range(resolution, start, end)
+        self.update(symbol, resolution, start, end, kind=kind)
+        return self.read(symbol, resolution, start, end)
+
+    def _fetch(self, kind, symbol, resolution, start, end):
+        """
+        Bars in [start, end] as arrays with UNIX second times, or None
+        when the request failed. Long ranges are sent in chunks.
+        """
+        fetch = getattr(self.client, CANDLE_METHODS[kind])
+        bars = fetch(symbol, resolution, start, end, as_arrays=True)
+        if bars is None:
+            return None
+        if self.client.RAW:
+            bars = to_ohlcv_arrays(bars)
+        bars['t'] = bars['t'].astype('int64')
+        return bars
+
+    @staticmethod
+    def _covered_until(bars, resolution, start, end):
+        """
+        The last bar of a range that reaches into the present may still
+        be forming, so leave it uncovered to have it refreshed next time.
+        """
+        if end < time.time() - RESOLUTION_SECONDS[str(resolution)]:
+            return end
+        if len(bars['t']):
+            return int(bars['t'][-1]) - 1
+        return start - 1
+
+    def _commit(self, symbol, resolution, manifest, fetched, covered):
+        """
+        Write the fetched bars to a new segment, merge segments as needed,
+        then swap in the new manifest. Called with the series locked.
+        """
+        dirname = self._series_dir(symbol, resolution)
+        segments = [list(s) for s in manifest['segments']]
+        number = manifest['next']
+        written = []
+
+        def write(records):
+            name = 'seg-{:06d}.npy'.format(number + len(written))
+            with open(os.path.join(dirname, name), 'wb') as f:
+                np.save(f, records)
+            written.append(name)
+            return [name, len(records)]
+
+        if fetched:
+            columns = {name: np.concatenate([bars[name] for bars in fetched])
+                       for name in ['t'] + FIELDS}
+            segments.append(write(_records(columns)))
+            # Merge the two newest segments while the older is at most twice
+            # as large: segment sizes halve from oldest to newest, so a
+            # series has about log2(bars) segments and each bar is rewritten
+            # about that many times over its life
+            while len(segments) > 1 and segments[-2][1] <= 2 * segments[-1][1]:
+                merged = _combine([np.load(os.path.join(dirname, name), mmap_mode='r')
+                                   for name, _ in segments[-2:]])
+                segments[-2:] = [write(_records(merged))]
+                del merged
+
+        fname = os.path.join(dirname, MANIFEST)
+        with open(fname + '.tmp', 'w') as f:
+            json.dump({'segments': segments, 'coverage': merge_ranges(covered),
+                       'next': number + len(written)}, f)
+        os.replace(fname + '.tmp', fname)
+
+        live = set(name for name, _ in segments)
+        for name, _ in manifest['segments']:
+            if name not in live:
+                self._remove(os.path.join(dirname, name))
+        for name in written:
+            if name not in live:
+                self._remove(os.path.join(dirname, name))
+
+    @staticmethod
+    def _remove(fname):
+        try:
+            os.remove(fname)
+        except OSError:
+            # Still memory-mapped on Windows, the file is left behind
+            pass
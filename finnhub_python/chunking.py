@@ -0,0 +1,149 @@
+"""
+Splitting of long date ranges into requests of endpoint-appropriate
+size, and merging of the chunked responses back into the payload a
+single request would have returned.
+"""
+
+import datetime
+
+from finnhub_python.utils import to_date
+
+DAY = 24 * 60 * 60
+
+# Seconds spanned by one bar of each supported resolution
+RESOLUTION_SECONDS = {
+    '1': 60,
+    '5': 5 * 60,
+    '15': 15 * 60,
+    '30': 30 * 60,
+    '60': 60 * 60,
+    'D': DAY,
+    'W': 7 * DAY,
+    'M': 31 * DAY,
+}
+
+# Longest range, in days, fetched in one candle request per resolution.
+# Daily and coarser bars always fit in a single request.
+CANDLE_CHUNK_DAYS = {
+    '1': 30,
+    '5': 90,
+    '15': 180,
+    '30': 365,
+    '60': 365,
+}
+
+# Longest range, in days, fetched in one request of the date range endpoints
+DATE_CHUNK_DAYS = {
+    '/company-news': 30,
+    '/stock/filings': 365,
+    '/stock/split': 5 * 365,
+}
+
+# Ranges are only split when longer than this many chunks, so one just
+# over a chunk, such as the 8 inclusive days of a 7 day lookback, is
+# still a single request
+MIN_SPLIT_CHUNKS = 1.5
+
+
+def split_seconds(start, end, span):
+    """
+    Consecutive inclusive (from, to) UNIX second ranges of at
+    most `span` seconds covering start to end.
+    """
+    start, end = int(start), int(end)
+    ranges = []
+    while start <= end:
+        stop = min(start + span - 1, end)
+        ranges.append((start, stop))
+        start = stop + 1
+    return ranges
+
+
+def split_dates(start, end, days):
+    """
+    Consecutive inclusive ('YYYY-MM-DD', 'YYYY-MM-DD') ranges of at
+    most `days` days covering start to end.
+    """
+    start, end = to_date(start), to_date(end)
+    step = datetime.timedelta(days=days)
+    one_day = datetime.timedelta(days=1)
+    ranges = []
+    while start <= end:
+        stop = min(start + step - one_day, end)
+        ranges.append((start.strftime('%Y-%m-%d'), stop.strftime('%Y-%m-%d')))
+        start = stop + one_day
+    return ranges
+
+
+def candle_ranges(resolution, start, end):
+    """Request ranges for candles between two UNIX times, None to send one request."""
+    days = CANDLE_CHUNK_DAYS.get(str(resolution))
+    try:
+        start, end = int(start), int(end)
+    except (TypeError, ValueError):
+        return None
+    if days is None or end - start < days * DAY:
+        return None
+    return split_seconds(start, end, days * DAY)
+
+
+def date_ranges(resource, start, end):
+    """
+    Request ranges for a date range endpoint, None to send one request.
+    Ranges up to MIN_SPLIT_CHUNKS chunks long are not split, longer ones
+    are cut into equal parts of at most the chunk size.
+    """
+    days = DATE_CHUNK_DAYS.get(resource)
+    if days is None or start is None or end is None:
+        return None
+    span = (to_date(end) - to_date(start)).days + 1
+    if span <= MIN_SPLIT_CHUNKS * days:
+        return None
+    parts = -(-span // days)
+    return split_dates(start, end, -(-span // parts))
+
+
+def merge_candles(parts):
+    """
+    Join candle responses of consecutive ranges into one, dropping bars
+    whose time was already returned by an earlier range.
+    """
+    merged = None
+    seen = set()
+    for bars in parts:
+        if not bars or bars.get('s') != 'ok':
+            continue
+        keep = [i for i, t in enumerate(bars['t']) if t not in seen]
+        seen.update(bars['t'])
+        if merged is None:
+            merged = {k: v for k, v in bars.items() if not isinstance(v, list)}
+        for key, values in bars.items():
+            if isinstance(values, list):
+                merged.setdefault(key, []).extend(values[i] for i in keep)
+    if merged is None:
+        # No range had data: answer like a single request would
+        return next((bars for bars in parts if bars), {'s': 'no_data'})
+    return merged
+
+
+def merge_records(parts, key, newest_first=False):
+    """
+    Join lists of records from consecutive ranges, dropping records
+    whose `key` was already seen.
+
+    :param newest_first: the endpoint lists records newest first, so the
+        ranges are joined from the latest one back.
+    """
+    if newest_first:
+        parts = reversed(parts)
+    merged = []
+    seen = set()
+    for records in parts:
+        for record in records or ():
+            value = record.get(key)
+            if value is not None:
+                if value in seen:
+                    continue
+                seen.add(value)
+            merged.append(record)
+    return merged
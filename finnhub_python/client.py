@@ -1,43 +1,126 @@
-import pandas as pd
-
 from finnhub_python.base import FinnHubBase
-from finnhub_python.options import FinnHubOptionChain
-from finnhub_python.utils import multicall, get_finnhub_api_key
+from finnhub_python.utils import multicall, imulticall, get_finnhub_api_key
 
 
 class FinnHubClient(FinnHubBase):
 
-    def __init__(self, api_key=None, env=None):
+    def __init__(self, api_key=None, env=None, pool_size=None, rate_limiter=None, cache=None,
+                 metrics=None, raw=None, retry_policy=None, circuit_breaker=None):
         if api_key is None:
             api_key = get_finnhub_api_key(env=env)
-        super(FinnHubClient, self).__init__(api_key=api_key)
+        super(FinnHubClient, self).__init__(
+            api_key=api_key, pool_size=pool_size, rate_limiter=rate_limiter, cache=cache,
+            metrics=metrics, raw=raw, retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+
+    @staticmethod
+    def _multi(stream):
+        """
+        The *_multi methods return {symbol: result or exception} once the
+        whole batch is done, or with stream=True an iterator of
+        (symbol, result or exception) in completion order.
+        """
+        return imulticall if stream else multicall
 
     def get_stock_option_chain(self, symbol):
         opts = super(FinnHubClient, self).get_stock_option_chain(symbol)
+        if self.RAW:
+            return opts
+        from finnhub_python.options import FinnHubOptionChain
         return FinnHubOptionChain(opts)
 
-    def get_stock_option_chain_multi(self, symbols):
-        return multicall(
+    def _get_stock_option_chain_decoded(self, symbol, decode_pool):
+        from finnhub_python.decode_pool import decode_option_chain
+        from finnhub_python.options import FinnHubOptionChain
+
+        body = self.fetch_body('/stock/option-chain', {'symbol': symbol})
+        if body is None:
+            return None
+        return FinnHubOptionChain.from_columns(*decode_pool.decode(decode_option_chain, body))
+
+    def get_stock_option_chain_multi(self, symbols, stream=False, max_workers=None, timeout=None,
+                                     decode_pool=None):
+        """
+        Pass a DecodePool to decode the chains in its worker processes
+        while the threads keep downloading. Ignored in raw mode.
+        """
+        if decode_pool is not None and not self.RAW:
+            return self._multi(stream)(
+                self._get_stock_option_chain_decoded,
+                symbols,
+                decode_pool,
+                max_workers=max_workers,
+                timeout=timeout,
+            )
+        return self._multi(stream)(
             self.get_stock_option_chain,
-            symbols
+            symbols,
+            max_workers=max_workers,
+            timeout=timeout,
         )
 
     def get_stock_earnings(self, symbol):
         earnings = super(FinnHubClient, self).get_stock_earnings(symbol)
+        if self.RAW:
+            return earnings
+        import pandas as pd
         df = pd.DataFrame(earnings)
         df.index = df.pop('period')
         return df.sort_index()
 
-    def get_stock_earnings_multi(self, symbols):
-        return multicall(
+    def get_stock_earnings_multi(self, symbols, stream=False, max_workers=None, timeout=None):
+        return self._multi(stream)(
             self.get_stock_earnings,
-            symbols
+            symbols,
+            max_workers=max_workers,
+            timeout=timeout,
         )
 
-    def get_stock_candles_multi(self, symbols, resolution='D', count=250):
-        return multicall(
-            self.get_stock_candles,
+    def _get_stock_candles_decoded(self, symbol, decode_pool, resolution='D', count=250,
+                                   as_arrays=False):
+        from finnhub_python.decode_pool import decode_candles
+        from finnhub_python.decorators import to_ohlcv_frame
+
+        params = {'symbol': symbol, 'resolution': resolution, 'count': str(count), 'format': 'json'}
+        body = self.fetch_body('/stock/candle', params)
+        if body is None:
+            return None
+        arrays = decode_pool.decode(decode_candles, body)
+        return arrays if as_arrays else to_ohlcv_frame(arrays)
+
+    def get_stock_candles_multi(self, symbols, resolution='D', count=250,
+                                stream=False, max_workers=None, timeout=None, panel=False,
+                                decode_pool=None):
+        """
+        With panel=True the candles are fetched as arrays and returned as a
+        CandlePanel, every symbol aligned on one UTC time index.
+        Pass a DecodePool to decode the candles in its worker processes
+        while the threads keep downloading. Ignored in raw mode.
+        """
+        func = self.get_stock_candles
+        args = ()
+        if decode_pool is not None and not self.RAW:
+            func = self._get_stock_candles_decoded
+            args = (decode_pool,)
+        if panel:
+            symbols = list(symbols)
+            bars = multicall(
+                func,
+                symbols,
+                *args,
+                resolution=resolution,
+                count=count,
+                as_arrays=True,
+                max_workers=max_workers,
+                timeout=timeout,
+            )
+            from finnhub_python.panel import CandlePanel
+            return CandlePanel.from_bars(bars, symbols)
+        return self._multi(stream)(
+            func,
             symbols,
+            *args,
             resolution=resolution,
             count=count,
+            max_workers=max_workers,
+            timeout=timeout,
         )
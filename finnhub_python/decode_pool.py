@@ -0,0 +1,78 @@
+"""
+Process pool for the CPU bound half of large batches.
+
+Threads spend most of a big multi-symbol batch holding the GIL while
+decoding json and building frames, so adding threads stops helping.
+With a DecodePool the threads only download response bodies and hand
+them to worker processes, which return compact numpy buffers that the
+calling process wraps into frames without touching each value.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from finnhub_python.decoding import get_loads
+
+_loads = None
+
+
+def _json(body):
+    global _loads
+    if _loads is None:
+        _loads = get_loads()
+    return _loads(body)
+
+
+def decode_candles(body):
+    """Candle response body to the arrays of to_ohlcv_arrays."""
+    from finnhub_python.decorators import to_ohlcv_arrays
+    return to_ohlcv_arrays(_json(body))
+
+
+def decode_option_chain(body):
+    """Option chain response body to the parts of option_chain_columns."""
+    from finnhub_python.options import option_chain_columns
+    return option_chain_columns(_json(body))
+
+
+class DecodePool(object):
+    """
+    Pool of `processes` worker processes decoding response bodies.
+    Defaults to one per core. Workers start on first use.
+
+        with DecodePool() as pool:
+            frames = client.get_stock_candles_multi(symbols, decode_pool=pool)
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            return self._executor
+
+    def submit(self, decoder, body):
+        """Future of decoder(body) run in a worker process."""
+        return self.executor.submit(decoder, body)
+
+    def decode(self, decoder, body):
+        """decoder(body) run in a worker process. The calling thread waits without the GIL."""
+        return self.submit(decoder, body).result()
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
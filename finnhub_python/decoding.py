@@ -0,0 +1,256 @@
+"""
+JSON decoding of api responses.
+
+`get_loads` picks the fastest json library installed (orjson, then ujson,
+then the standard library). `iter_array` and `iter_members` parse a body
+incrementally from an iterable of byte chunks, so that only one element
+of a large response is held as Python objects at a time. aiter_array and
+aiter_members do the same over an async iterable.
+"""
+
+import codecs
+import json
+import re
+
+# Tried in order when no backend is named
+BACKENDS = ('orjson', 'ujson', 'json')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,:]}'
+
+
+def get_loads(backend=None):
+    """
+    loads function of the json library `backend`, or of the fastest one
+    installed. Bodies the fast libraries reject, such as NaN literals or
+    integers wider than 64 bits, are decoded again with the standard library.
+    """
+    names = BACKENDS if backend is None else (backend,)
+    for name in names:
+        if name == 'json':
+            return json.loads
+        try:
+            module = __import__(name)
+        except ImportError:
+            if backend is not None:
+                raise
+            continue
+        return _with_fallback(module.loads)
+    return json.loads
+
+
+def _with_fallback(fast_loads):
+    def loads(data):
+        try:
+            return fast_loads(data)
+        except ValueError:
+            return json.loads(data)
+    return loads
+
+
+# Yielded by the _Reader parsing generators when they need the next chunk
+_MORE = object()
+
+
+class _Reader(object):
+    """
+    Text buffer over a stream of chunks, read ahead only as far as needed.
+
+    The parsing methods are generators yielding _MORE whenever the buffer
+    runs short. The driver answers with feed(), passing the next chunk,
+    or None at the end of the stream, so the same parser serves blocking
+    iterables and asyncio streams.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self._added = False
+
+    def feed(self, chunk):
+        """Append the next chunk, None once the stream is exhausted."""
+        self._added = False
+        if chunk is None:
+            if not self.eof:
+                self._utf8.decode(b'', final=True)
+                self.eof = True
+            return
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+        if chunk:
+            # Drop what was consumed so the buffer only spans the current value
+            self.buf = self.buf[self.pos:] + chunk
+            self.pos = 0
+            self._added = True
+
+    def _fill(self, size=0):
+        """
+        Ask for chunks until at least `size` unread characters are buffered
+        (at least one chunk). False once the stream is exhausted.
+        """
+        added = False
+        while not self.eof:
+            yield _MORE
+            if self._added:
+                added = True
+                if len(self.buf) >= size:
+                    return True
+        return added
+
+    def peek(self):
+        """Next non whitespace character, '' at the end of the stream."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not (yield from self._fill()):
+                return ''
+
+    def expect(self, chars):
+        c = yield from self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expected one of {!r} at {!r}'.format(
+                chars, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next complete json value."""
+        yield from self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                # Incomplete value: read until the buffer doubles, which keeps
+                # the re-decoding of long values linear overall
+                if self.eof or not (yield from self._fill(2 * (len(self.buf) - self.pos))):
+                    raise
+                continue
+            # A number cut by the end of the buffer (as in '1.' or '1e') may
+            # go on in the next chunk; a complete value is always followed by
+            # a delimiter
+            if (end == len(self.buf) or self.buf[end] not in _DELIMITERS) \
+                    and not self.eof and (yield from self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def elements(self):
+        """Yields the elements of an array."""
+        yield from self.expect('[')
+        if (yield from self.peek()) == ']':
+            self.pos += 1
+            return
+        while True:
+            yield (yield from self.value())
+            if (yield from self.expect(',]')) == ']':
+                return
+
+    def members(self, member):
+        """
+        Parses an object, delegating to the generator member(name) for
+        the value of each member.
+        """
+        yield from self.expect('{')
+        if (yield from self.peek()) == '}':
+            self.pos += 1
+            return
+        while True:
+            name = yield from self.value()
+            if not isinstance(name, str):
+                raise ValueError('Object key is not a string: {!r}'.format(name))
+            yield from self.expect(':')
+            yield from member(name)
+            if (yield from self.expect(',}')) == '}':
+                return
+
+
+def _parse_members(reader):
+    def member(name):
+        value = yield from reader.value()
+        yield name, value
+    return reader.members(member)
+
+
+def _parse_array(reader, key, meta):
+    if key is None:
+        return reader.elements()
+
+    def member(name):
+        if name == key and (yield from reader.peek()) == '[':
+            yield from reader.elements()
+        else:
+            value = yield from reader.value()
+            if meta is not None:
+                meta[name] = value
+    return reader.members(member)
+
+
+def _run(parse, chunks, *args):
+    reader = _Reader()
+    chunks = iter(chunks)
+    for item in parse(reader, *args):
+        if item is _MORE:
+            reader.feed(next(chunks, None))
+        else:
+            yield item
+
+
+async def _arun(parse, chunks, *args):
+    reader = _Reader()
+    chunks = chunks.__aiter__()
+    for item in parse(reader, *args):
+        if item is _MORE:
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                chunk = None
+            reader.feed(chunk)
+        else:
+            yield item
+
+
+def iter_members(chunks):
+    """
+    Generator over the (name, value) members of a top level json object,
+    decoding one value at a time.
+
+    :param chunks: iterable of bytes or str, e.g. Response.iter_content().
+    """
+    return _run(_parse_members, chunks)
+
+
+def iter_array(chunks, key=None, meta=None):
+    """
+    Generator over the elements of a json array, decoding one element at
+    a time.
+
+    :param chunks: iterable of bytes or str, e.g. Response.iter_content().
+    :param key: member of the top level object holding the array.
+        None when the body is the array itself.
+    :param meta: optional dict receiving the other top level members.
+    """
+    return _run(_parse_array, chunks, key, meta)
+
+
+def aiter_members(chunks):
+    """
+    Same as iter_members, for use with "async for".
+
+    :param chunks: async iterable of bytes or str,
+        e.g. aiohttp's response.content.iter_chunked(size).
+    """
+    return _arun(_parse_members, chunks)
+
+
+def aiter_array(chunks, key=None, meta=None):
+    """
+    Same as iter_array, for use with "async for".
+
+    :param chunks: async iterable of bytes or str,
+        e.g. aiohttp's response.content.iter_chunked(size).
+    """
+    return _arun(_parse_array, chunks, key, meta)
@@ -1,23 +1,69 @@
+import time
 from functools import wraps
-import pandas as pd
 
 
 def ohlcv_frame(func):
     """
     Decorator to return a Pandas.DataFrame for candle data.
+
+    Pass as_arrays=True to the decorated method to skip the
+    DataFrame and get the dict of numpy arrays from to_ohlcv_arrays.
+    Clients in raw mode return the json payload untouched.
     """
 
     @wraps(func)
     def _wrapper(*args, **kwargs):
-        bars = func(*args, **kwargs)
-        df = pd.DataFrame(bars)
-        df.index = df.pop('t').apply(pd.Timestamp.fromtimestamp)
-        df = df.tz_localize('utc')
-        return df
+        as_arrays = kwargs.pop('as_arrays', False)
+        owner = args[0] if args else None
+        if getattr(owner, 'RAW', False):
+            return func(*args, **kwargs)
+        converter = to_ohlcv_arrays if as_arrays else to_ohlcv_frame
+        converter = _timed(converter, owner, func.__name__)
+        return _convert(converter, func(*args, **kwargs))
 
     return _wrapper
 
 
+def to_ohlcv_arrays(bars):
+    """
+    Decode a candle response into numpy arrays.
+
+    't' becomes a datetime64[s] array of UTC times and every other list
+    becomes a typed array. Scalar entries such as the 's' status are
+    passed through unchanged.
+    """
+    import numpy as np
+
+    out = {}
+    if not bars or 't' not in bars:
+        out['t'] = np.empty(0, dtype='datetime64[s]')
+        return out
+    for key, values in bars.items():
+        if key == 't':
+            out[key] = np.asarray(values, dtype='int64').astype('datetime64[s]')
+        elif isinstance(values, (list, tuple, np.ndarray)):
+            out[key] = np.asarray(values)
+        else:
+            out[key] = values
+    return out
+
+
+def to_ohlcv_frame(bars):
+    """
+    Build a DataFrame indexed by UTC bar time from a candle response
+    or from the arrays returned by to_ohlcv_arrays.
+    """
+    import numpy as np
+    import pandas as pd
+
+    arrays = to_ohlcv_arrays(bars)
+    t = arrays.pop('t')
+    if t.dtype.kind != 'M':
+        t = np.asarray(t, dtype='int64').astype('datetime64[s]')
+    index = pd.DatetimeIndex(t, name='t').tz_localize('utc')
+    return pd.DataFrame(arrays, index=index)
+
+
 def economic_data_frame(func):
     """
     Decorator to return a Pandas.DataFrame for economic data.
@@ -25,9 +71,48 @@ def economic_data_frame(func):
 
     @wraps(func)
     def _wrapper(self, code):
-        data = func(self, code)
-        df = pd.DataFrame(data).set_index('date')
-        df.index = pd.DatetimeIndex(df.index).tz_localize('utc')
-        return df.sort_index()
+        if self.RAW:
+            return func(self, code)
+        converter = _timed(to_economic_data_frame, self, func.__name__)
+        return _convert(converter, func(self, code))
 
     return _wrapper
+
+
+def to_economic_data_frame(data):
+    import pandas as pd
+
+    df = pd.DataFrame(data).set_index('date')
+    df.index = pd.DatetimeIndex(df.index).tz_localize('utc')
+    return df.sort_index()
+
+
+def _timed(converter, owner, name):
+    """Record the converter's run time in the owner's metrics, when enabled."""
+    metrics = getattr(owner, 'metrics', None)
+    if metrics is None or not metrics.enabled:
+        return converter
+
+    def _converter(data):
+        start = time.perf_counter()
+        out = converter(data)
+        metrics.record_frame(name, time.perf_counter() - start)
+        return out
+
+    return _converter
+
+
+def _convert(converter, data):
+    """
+    Apply `converter` to an api result. Coroutines returned by
+    the async client are converted once they have been awaited.
+    None, a request that failed, is returned as is.
+    """
+    if hasattr(data, '__await__'):
+        return _convert_awaitable(converter, data)
+    return None if data is None else converter(data)
+
+
+async def _convert_awaitable(converter, awaitable):
+    data = await awaitable
+    return None if data is None else converter(data)
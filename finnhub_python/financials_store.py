@@ -0,0 +1,275 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from finnhub_python.utils import multicall
+
+# Columns of the long table, one row per reported line item
+COLUMNS = ['symbol', 'accessNumber', 'period', 'statement', 'concept', 'value', 'unit']
+
+# Filing fields kept from each report besides its line items
+FILING_FIELDS = ['accessNumber', 'symbol', 'cik', 'freq', 'form', 'year', 'quarter',
+                 'startDate', 'endDate', 'filedDate']
+
+_CATEGORIES = ['symbol', 'accessNumber', 'period', 'statement', 'concept', 'unit']
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def report_rows(report, symbol=None):
+    """
+    Line items of one filing from /stock/financials-reported as tuples
+    in COLUMNS order. The period is the filing's end date.
+    Values that are not numbers are stored as None.
+    """
+    symbol = symbol or report.get('symbol')
+    access_number = report.get('accessNumber')
+    period = (report.get('endDate') or '')[:10] or None
+    for statement, items in (report.get('report') or {}).items():
+        if isinstance(items, dict):
+            # Older filings map concept -> value
+            items = [{'concept': k, 'value': v} for k, v in items.items()]
+        for item in items or ():
+            yield (symbol, access_number, period, statement, item.get('concept'),
+                   _float(item.get('value')), item.get('unit'))
+
+
+def _compact_frame(rows):
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    for column in _CATEGORIES:
+        df[column] = df[column].astype('category')
+    df['value'] = df['value'].astype('float64')
+    return df
+
+
+def flatten_financials(data, symbol=None):
+    """
+    Long DataFrame with COLUMNS from a financials as reported response,
+    or from an iterable of its reports. Repeated strings are stored as
+    categoricals, a fraction of the size of the nested response.
+    """
+    if isinstance(data, dict):
+        symbol = data.get('symbol') or symbol
+        data = data.get('data') or ()
+    return _compact_frame([row for report in data for row in report_rows(report, symbol)])
+
+
+class FinancialsStore(object):
+    """
+    Local store of financials as reported, normalized to one long table
+    of line items (COLUMNS) in a SQLite file under `path`.
+
+    Line items are indexed on (symbol, concept) for one company's
+    history and on (concept, period) for cross sections, so queries
+    read only the rows they return.
+
+    update() streams a symbol's filings one report at a time and stores
+    only the access numbers it does not have yet. The api has no way to
+    ask for new filings only, so each update still downloads the list;
+    pass max_age to skip symbols updated recently.
+
+        store = FinancialsStore(client, '~/finnhub/financials')
+        store.update_many(symbols, freq='quarterly')
+        revenue = store.cross_section('us-gaap_Revenues', latest=True)
+
+    :param client: FinnHubClient used to download filings
+    :param path: str: root directory of the store
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = os.path.expanduser(path)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self.db_file = os.path.join(self.path, 'financials.sqlite')
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS filings (accessNumber TEXT, symbol TEXT, '
+                'cik TEXT, freq TEXT, form TEXT, year INTEGER, quarter INTEGER, '
+                'startDate TEXT, endDate TEXT, filedDate TEXT, '
+                # Share classes such as GOOG and GOOGL report the same filings
+                'PRIMARY KEY (symbol, accessNumber))')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS facts (symbol TEXT, accessNumber TEXT, period TEXT, '
+                'statement TEXT, concept TEXT, value REAL, unit TEXT)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS updates (symbol TEXT, freq TEXT, updated REAL, '
+                'PRIMARY KEY (symbol, freq))')
+            conn.execute('CREATE INDEX IF NOT EXISTS facts_symbol_concept ON facts (symbol, concept)')
+            conn.execute('CREATE INDEX IF NOT EXISTS facts_concept_period ON facts (concept, period)')
+
+    def _conn(self):
+        # Connections are per thread, and never reused in a forked child
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            import sqlite3
+            conn = sqlite3.connect(self.db_file, timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # The store can always be downloaded again: skip the fsync per commit
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        # Threads queue here rather than in SQLite's sleeping busy handler
+        with self._write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _select(self, sql, params=()):
+        import pandas as pd
+
+        return pd.read_sql_query(sql, self._conn(), params=list(params))
+
+    def access_numbers(self, symbol):
+        """Access numbers of the filings stored for a symbol."""
+        rows = self._conn().execute('SELECT accessNumber FROM filings WHERE symbol = ?', (symbol,))
+        return set(row[0] for row in rows)
+
+    def last_updated(self, symbol, freq='annual'):
+        """UNIX time of the symbol's last update, or None."""
+        row = self._conn().execute(
+            'SELECT updated FROM updates WHERE symbol = ? AND freq = ?', (symbol, freq)).fetchone()
+        return None if row is None else row[0]
+
+    def update(self, symbol, freq='annual', max_age=None):
+        """
+        Download a symbol's filings and store the ones not stored yet.
+
+        :param freq: 'annual' or 'quarterly'
+        :param max_age: seconds: skip the symbol if it was updated more recently.
+        :return: int: number of new filings
+        """
+        if max_age is not None:
+            updated = self.last_updated(symbol, freq)
+            if updated is not None and time.time() - updated < max_age:
+                return 0
+
+        # Skips decoding filings already stored; what is new is settled
+        # again inside the write transaction, as another thread or process
+        # may be storing the same symbol
+        known = self.access_numbers(symbol)
+        filings = []
+        for report in self.client.iter_stock_financials_as_reported(symbol, freq=freq):
+            access_number = report.get('accessNumber')
+            if access_number is None or access_number in known:
+                continue
+            known.add(access_number)
+            # Stored under the symbol asked for, whatever the filing says
+            filing = dict(report, symbol=symbol, freq=freq)
+            filings.append((tuple(filing.get(f) for f in FILING_FIELDS),
+                            list(report_rows(report, symbol))))
+
+        new = 0
+        with self._transaction() as conn:
+            for filing, facts in filings:
+                inserted = conn.execute(
+                    'INSERT OR IGNORE INTO filings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', filing)
+                if inserted.rowcount:
+                    conn.executemany('INSERT INTO facts VALUES (?, ?, ?, ?, ?, ?, ?)', facts)
+                    new += 1
+            conn.execute('INSERT OR REPLACE INTO updates VALUES (?, ?, ?)',
+                         (symbol, freq, time.time()))
+        return new
+
+    def update_many(self, symbols, freq='annual', max_age=None, max_workers=None):
+        """
+        update() several symbols concurrently.
+
+        :return: dictionary {symbol: number of new filings or exception}
+        """
+        return multicall(self.update, symbols, freq=freq, max_age=max_age, max_workers=max_workers)
+
+    def symbols(self):
+        rows = self._conn().execute('SELECT DISTINCT symbol FROM filings ORDER BY symbol')
+        return [row[0] for row in rows]
+
+    def filings(self, symbol):
+        """DataFrame of a symbol's stored filings, oldest first."""
+        return self._select('SELECT * FROM filings WHERE symbol = ? ORDER BY endDate, filedDate',
+                            (symbol,))
+
+    def read(self, symbol, concepts=None, statement=None):
+        """
+        Line items of one symbol as a long DataFrame with COLUMNS.
+
+        :param concepts: optional list of concepts to read
+        :param statement: optional 'bs', 'ic' or 'cf'
+        """
+        sql = 'SELECT {} FROM facts WHERE symbol = ?'.format(', '.join(COLUMNS))
+        params = [symbol]
+        if concepts is not None:
+            concepts = list(concepts)
+            sql += ' AND concept IN ({})'.format(', '.join('?' * len(concepts)))
+            params += concepts
+        if statement is not None:
+            sql += ' AND statement = ?'
+            params.append(statement)
+        rows = self._conn().execute(sql + ' ORDER BY period, concept', params).fetchall()
+        return _compact_frame(rows)
+
+    def cross_section(self, concept, period=None, freq=None, symbols=None, latest=False):
+        """
+        One concept across every stored symbol.
+
+        When several filings report the same symbol and period, the
+        value from the one filed last is kept.
+
+        :param period: 'YYYY-MM-DD' period end date, for one period only.
+        :param freq: only filings downloaded with this freq.
+        :param symbols: optional list of symbols to keep.
+        :param latest: the most recent period of each symbol.
+        :return: DataFrame indexed by symbol with a column per period, or a
+            Series of values by symbol when `period` or `latest` is given.
+        """
+        sql = ('SELECT f.symbol, f.period, f.value FROM facts f '
+               'JOIN filings g ON g.symbol = f.symbol AND g.accessNumber = f.accessNumber '
+               'WHERE f.concept = ?')
+        params = [concept]
+        if period is not None:
+            sql += ' AND f.period = ?'
+            params.append(period)
+        if freq is not None:
+            sql += ' AND g.freq = ?'
+            params.append(freq)
+        if symbols is not None:
+            symbols = list(symbols)
+            sql += ' AND f.symbol IN ({})'.format(', '.join('?' * len(symbols)))
+            params += symbols
+        df = self._select(sql + ' ORDER BY g.filedDate', params)
+        df = df.drop_duplicates(['symbol', 'period'], keep='last')
+
+        if period is not None or latest:
+            if latest:
+                df = df.sort_values('period').drop_duplicates('symbol', keep='last')
+            series = df.set_index('symbol')['value'].sort_index()
+            series.name = concept
+            return series
+        return df.pivot(index='symbol', columns='period', values='value')
+
+    def clear(self, symbol=None):
+        """Delete one symbol, or everything."""
+        with self._transaction() as conn:
+            for table in ('facts', 'filings', 'updates'):
+                if symbol is None:
+                    conn.execute('DELETE FROM {}'.format(table))
+                else:
+                    conn.execute('DELETE FROM {} WHERE symbol = ?'.format(table), (symbol,))
@@ -0,0 +1,486 @@
+"""
+Technical indicators computed locally from candles, instead of the
+/scan endpoints and their 10 calls per minute.
+
+The functions take numpy arrays, DataFrame columns or CandlePanel
+blocks. 2-D input is (times, symbols) and every column is computed on
+its own. NaN marks a missing bar: it is skipped, so each column is
+computed over the bars it has, and the output is NaN there too.
+
+Moving averages start with the simple average of their first `period`
+values, as in TA-Lib. RSI and ATR use Wilder's smoothing.
+
+For live data, the SMA, EMA, RSI, MACD and ATR classes hold the state
+of one series and update it in constant time per bar. IndicatorEngine
+keeps them for many symbols and can take bars from a BarAggregator.
+"""
+
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+nan = float('nan')
+
+
+def _check_period(period):
+    if int(period) != period or period < 1:
+        raise ValueError('period must be a positive integer, got {!r}'.format(period))
+    return int(period)
+
+
+def _by_column(func, *arrays):
+    """
+    Run func on 2-D float arrays whose NaNs have been moved to the end
+    of each column. Put the results back in place, NaN where any input is NaN.
+    """
+    arrays = [np.asarray(a, dtype='float64') for a in arrays]
+    one_d = arrays[0].ndim == 1
+    arrays = [a.reshape(len(a), -1) for a in arrays]
+    valid = ~np.isnan(arrays[0])
+    for a in arrays[1:]:
+        valid &= ~np.isnan(a)
+
+    if valid.all():
+        results = func(*arrays)
+    else:
+        order = np.argsort(~valid, axis=0, kind='stable')
+        tail = ~np.take_along_axis(valid, order, axis=0)
+        dense = []
+        for a in arrays:
+            a = np.take_along_axis(a, order, axis=0)
+            a[tail] = np.nan
+            dense.append(a)
+        results = []
+        for r in func(*dense):
+            out = np.empty_like(r)
+            np.put_along_axis(out, order, r, axis=0)
+            out[~valid] = np.nan
+            results.append(out)
+    if one_d:
+        results = [r.ravel() for r in results]
+    return tuple(results)
+
+
+def _rolling_mean(x, period):
+    valid = ~np.isnan(x)
+    count = np.cumsum(valid, axis=0)
+    sums = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    out = sums.copy()
+    out[period:] -= sums[:-period]
+    out /= period
+    out[~valid | (count < period)] = np.nan
+    return out
+
+
+def _smooth(x, period, alpha):
+    """Exponential smoothing seeded with the mean of the first `period` values."""
+    import pandas as pd
+
+    valid = ~np.isnan(x)
+    count = np.cumsum(valid, axis=0)
+    seed = valid & (count == period)
+    seeded = np.where(count > period, x, np.nan)
+    seeded[seed] = np.cumsum(np.where(valid, x, 0.0), axis=0)[seed] / period
+    out = pd.DataFrame(seeded).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy(copy=True)
+    out[~valid | (count < period)] = np.nan
+    return out
+
+
+def _true_range(high, low, close):
+    prev = np.full_like(close, np.nan)
+    prev[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    # The first bar has no previous close
+    tr[np.isnan(prev)] = np.nan
+    return tr
+
+
+def sma(x, period=20):
+    """Simple moving average."""
+    period = _check_period(period)
+    return _by_column(lambda a: [_rolling_mean(a, period)], x)[0]
+
+
+def ema(x, period=20):
+    """Exponential moving average, alpha = 2 / (period + 1)."""
+    period = _check_period(period)
+    return _by_column(lambda a: [_smooth(a, period, 2.0 / (period + 1))], x)[0]
+
+
+def _rsi(close, period):
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[np.isnan(delta)] = loss[np.isnan(delta)] = np.nan
+    avg_gain = _smooth(gain, period, 1.0 / period)
+    avg_loss = _smooth(loss, period, 1.0 / period)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.where(total > 0, 100.0 * avg_gain / total, 50.0)
+    out[np.isnan(total)] = np.nan
+    return [out]
+
+
+def rsi(close, period=14):
+    """Relative strength index (0 to 100) with Wilder's smoothing."""
+    period = _check_period(period)
+    return _by_column(lambda c: _rsi(c, period), close)[0]
+
+
+def _macd(close, fast, slow, signal):
+    line = _smooth(close, fast, 2.0 / (fast + 1)) - _smooth(close, slow, 2.0 / (slow + 1))
+    sig = _smooth(line, signal, 2.0 / (signal + 1))
+    return [line, sig, line - sig]
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Moving average convergence divergence.
+
+    :return: tuple of arrays (macd, signal, histogram)
+    """
+    fast, slow, signal = _check_period(fast), _check_period(slow), _check_period(signal)
+    return _by_column(lambda c: _macd(c, fast, slow, signal), close)
+
+
+def atr(high, low, close, period=14):
+    """Average true range with Wilder's smoothing."""
+    period = _check_period(period)
+    return _by_column(lambda h, l, c: [_smooth(_true_range(h, l, c), period, 1.0 / period)],
+                      high, low, close)[0]
+
+
+def pivot_points(high, low, close):
+    """
+    Classic floor trader pivots from one bar's high, low and close,
+    the levels for the bar after it. Works on scalars and arrays.
+
+    :return: dict of 'p', 'r1', 's1', 'r2', 's2', 'r3', 's3'
+    """
+    high, low, close = [np.asarray(a, dtype='float64') for a in (high, low, close)]
+    p = (high + low + close) / 3.0
+    return {
+        'p': p,
+        'r1': 2 * p - low,
+        's1': 2 * p - high,
+        'r2': p + (high - low),
+        's2': p - (high - low),
+        'r3': high + 2 * (p - low),
+        's3': low - 2 * (high - p),
+    }
+
+
+def support_resistance(high, low, window=5, tolerance=0.005):
+    """
+    Support and resistance levels of one symbol, like the 'levels'
+    of /scan/support-resistance.
+
+    A swing high is a high that is the highest of the `window` bars on
+    each side of it, a swing low likewise. Swing points within
+    `tolerance` (a fraction of price) of each other are merged into one
+    level, their mean.
+
+    :return: list of price levels, ascending
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    span = 2 * window + 1
+    if len(high) < span:
+        return []
+    center = slice(window, len(high) - window)
+    swing_high = high[center] == np.fmax.reduce(sliding_window_view(high, span), axis=1)
+    swing_low = low[center] == np.fmin.reduce(sliding_window_view(low, span), axis=1)
+    points = np.sort(np.concatenate([high[center][swing_high], low[center][swing_low]]))
+
+    levels = []
+    cluster = []
+    for point in points:
+        if cluster and point > cluster[0] * (1 + tolerance):
+            levels.append(sum(cluster) / len(cluster))
+            cluster = []
+        cluster.append(point)
+    if cluster:
+        levels.append(sum(cluster) / len(cluster))
+    return [float(level) for level in levels]
+
+
+def compute_indicators(bars, sma_periods=(20, 50), ema_periods=(20,), rsi_period=14,
+                       macd_periods=(12, 26, 9), atr_period=14):
+    """
+    Every indicator for a frame from ohlcv_frame, the arrays from
+    to_ohlcv_arrays or a CandlePanel. Pass None or () to leave one out.
+
+    :return: OrderedDict {name: array}, named as in IndicatorEngine.
+    """
+    out = OrderedDict()
+    close = bars['c']
+    for period in sma_periods or ():
+        out['sma_{}'.format(period)] = sma(close, period)
+    for period in ema_periods or ():
+        out['ema_{}'.format(period)] = ema(close, period)
+    if rsi_period:
+        out['rsi_{}'.format(rsi_period)] = rsi(close, rsi_period)
+    if macd_periods:
+        out['macd'], out['macd_signal'], out['macd_hist'] = macd(close, *macd_periods)
+    if atr_period:
+        out['atr_{}'.format(atr_period)] = atr(bars['h'], bars['l'], close, atr_period)
+    return out
+
+
+class SMA(object):
+    """Simple moving average, updated one value at a time."""
+
+    def __init__(self, period=20):
+        self.period = _check_period(period)
+        self.value = nan
+        self._window = deque()
+        self._sum = 0.0
+        self._updates = 0
+
+    def update(self, x):
+        """Add one value and return the average, NaN while warming up."""
+        if math.isnan(x):
+            return self.value
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        self._updates += 1
+        if self._updates % self.period == 0:
+            # Resum now and then so rounding errors do not pile up
+            self._sum = math.fsum(self._window)
+        if len(self._window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+
+class EMA(object):
+    """
+    Exponential moving average, updated one value at a time.
+
+    :param alpha: smoothing factor, 2 / (period + 1) by default.
+    """
+
+    def __init__(self, period=20, alpha=None):
+        self.period = _check_period(period)
+        self.alpha = 2.0 / (self.period + 1) if alpha is None else alpha
+        self.value = nan
+        self._count = 0
+        self._sum = 0.0
+
+    @property
+    def ready(self):
+        return self._count >= self.period
+
+    def update(self, x):
+        """Add one value and return the average, NaN while warming up."""
+        if math.isnan(x):
+            return self.value
+        if self._count < self.period:
+            self._count += 1
+            self._sum += x
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RSI(object):
+    """Relative strength index, updated one close at a time."""
+
+    def __init__(self, period=14):
+        self.period = _check_period(period)
+        self.value = nan
+        self._prev = None
+        self._gain = EMA(self.period, 1.0 / self.period)
+        self._loss = EMA(self.period, 1.0 / self.period)
+
+    def update(self, close):
+        if math.isnan(close):
+            return self.value
+        if self._prev is not None:
+            delta = close - self._prev
+            gain = self._gain.update(max(delta, 0.0))
+            loss = self._loss.update(max(-delta, 0.0))
+            if self._gain.ready:
+                total = gain + loss
+                self.value = 100.0 * gain / total if total > 0 else 50.0
+        self._prev = close
+        return self.value
+
+
+class MACD(object):
+    """MACD, updated one close at a time. update returns (macd, signal, histogram)."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+        self.value = (nan, nan, nan)
+
+    def update(self, close):
+        if math.isnan(close):
+            return self.value
+        fast = self._fast.update(close)
+        slow = self._slow.update(close)
+        if self._fast.ready and self._slow.ready:
+            line = fast - slow
+            signal = self._signal.update(line)
+            self.value = (line, signal, line - signal)
+        return self.value
+
+
+class ATR(object):
+    """Average true range, updated one bar at a time."""
+
+    def __init__(self, period=14):
+        self.period = _check_period(period)
+        self.value = nan
+        self._prev = None
+        self._range = EMA(self.period, 1.0 / self.period)
+
+    def update(self, high, low, close):
+        if math.isnan(high) or math.isnan(low) or math.isnan(close):
+            return self.value
+        if self._prev is not None:
+            prev = self._prev
+            self.value = self._range.update(max(high - low, abs(high - prev), abs(low - prev)))
+        self._prev = close
+        return self.value
+
+
+class IndicatorEngine(object):
+    """
+    Incremental indicators for many symbols.
+
+    seed() runs a symbol's history through the indicators once, after
+    which every new bar costs a constant amount of work however long
+    the history is. Bars at or before a symbol's last bar are ignored,
+    so live bars may overlap the seeded history.
+
+        engine = IndicatorEngine(resolution='1')
+        engine.seed('AAPL', client.get_stock_candles('AAPL', resolution='1'))
+        aggregator = BarAggregator(resolutions=['1'], on_bar=engine.on_bar)
+
+    The parameters match compute_indicators and so do the value names:
+    'sma_20', 'ema_20', 'rsi_14', 'macd', 'macd_signal', 'macd_hist', 'atr_14'.
+
+    :param resolution: only take bars of this resolution in on_bar.
+    """
+
+    def __init__(self, sma_periods=(20, 50), ema_periods=(20,), rsi_period=14,
+                 macd_periods=(12, 26, 9), atr_period=14, resolution=None):
+        self.sma_periods = tuple(sma_periods or ())
+        self.ema_periods = tuple(ema_periods or ())
+        self.rsi_period = rsi_period
+        self.macd_periods = tuple(macd_periods or ())
+        self.atr_period = atr_period
+        self.resolution = None if resolution is None else str(resolution)
+        self._states = {}
+        self._last = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        names = ['sma_{}'.format(p) for p in self.sma_periods]
+        names += ['ema_{}'.format(p) for p in self.ema_periods]
+        if self.rsi_period:
+            names.append('rsi_{}'.format(self.rsi_period))
+        if self.macd_periods:
+            names += ['macd', 'macd_signal', 'macd_hist']
+        if self.atr_period:
+            names.append('atr_{}'.format(self.atr_period))
+        return names
+
+    def _make_states(self):
+        return {
+            'sma': [SMA(p) for p in self.sma_periods],
+            'ema': [EMA(p) for p in self.ema_periods],
+            'rsi': RSI(self.rsi_period) if self.rsi_period else None,
+            'macd': MACD(*self.macd_periods) if self.macd_periods else None,
+            'atr': ATR(self.atr_period) if self.atr_period else None,
+        }
+
+    def _update(self, symbol, t, high, low, close):
+        last = self._last.get(symbol)
+        if last is not None and t <= last:
+            return False
+        self._last[symbol] = t
+        states = self._states.get(symbol)
+        if states is None:
+            states = self._states[symbol] = self._make_states()
+        for state in states['sma']:
+            state.update(close)
+        for state in states['ema']:
+            state.update(close)
+        if states['rsi'] is not None:
+            states['rsi'].update(close)
+        if states['macd'] is not None:
+            states['macd'].update(close)
+        if states['atr'] is not None:
+            states['atr'].update(high, low, close)
+        return True
+
+    def update(self, symbol, t, high, low, close):
+        """
+        Add one finished bar and return the symbol's values.
+
+        :param t: bar time in UNIX seconds
+        """
+        with self._lock:
+            self._update(symbol, t, high, low, close)
+        return self.values(symbol)
+
+    def on_bar(self, bar):
+        """Take a Bar from BarAggregator, for use as its on_bar callback."""
+        if self.resolution is not None and bar.resolution != self.resolution:
+            return
+        self.update(bar.symbol, bar.t, bar.h, bar.l, bar.c)
+
+    def seed(self, symbol, bars):
+        """
+        Run a history of finished bars through the indicators.
+
+        :param bars: frame from ohlcv_frame or arrays from to_ohlcv_arrays
+        """
+        t = bars['t'] if isinstance(bars, dict) else bars.index.values
+        t = np.asarray(t)
+        if t.dtype.kind == 'M':
+            t = t.astype('datetime64[s]').astype('int64')
+        columns = zip(t.tolist(), *[np.asarray(bars[f], dtype='float64').tolist() for f in 'hlc'])
+        with self._lock:
+            for ts, high, low, close in columns:
+                self._update(symbol, ts, high, low, close)
+
+    def values(self, symbol):
+        """OrderedDict {name: latest value} for one symbol, NaN while warming up."""
+        with self._lock:
+            states = self._states.get(symbol)
+            if states is None:
+                return OrderedDict((name, nan) for name in self.names)
+            values = [s.value for s in states['sma']] + [s.value for s in states['ema']]
+            if states['rsi'] is not None:
+                values.append(states['rsi'].value)
+            if states['macd'] is not None:
+                values.extend(states['macd'].value)
+            if states['atr'] is not None:
+                values.append(states['atr'].value)
+        return OrderedDict(zip(self.names, values))
+
+    @property
+    def symbols(self):
+        return list(self._states)
+
+    def to_frame(self):
+        """DataFrame of the latest values, a row per symbol, for screening."""
+        import pandas as pd
+
+        symbols = self.symbols
+        return pd.DataFrame([list(self.values(s).values()) for s in symbols],
+                            index=pd.Index(symbols, name='symbol'), columns=self.names)
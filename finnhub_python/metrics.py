@@ -0,0 +1,185 @@
+import bisect
+import threading
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(2 ** i for i in range(8, 28, 2))
+
+
+class Histogram(object):
+    """Fixed bucket histogram. `counts[i]` holds values <= bounds[i], the last slot the rest."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction `q` of values fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (self.max,), self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.bounds] + ['+Inf'], self.counts)),
+        }
+
+
+class ResourceMetrics(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.limit_sleep = Histogram(LATENCY_BUCKETS)
+        self.decode = Histogram(LATENCY_BUCKETS)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'latency': self.latency.to_dict(),
+            'size': self.size.to_dict(),
+            'limit_sleep': self.limit_sleep.to_dict(),
+            'decode': self.decode.to_dict(),
+        }
+
+
+class NullMetrics(object):
+    """Metrics sink that records nothing. Call sites skip timing when `enabled` is False."""
+    enabled = False
+
+    def record_request(self, resource, seconds, status, nbytes):
+        pass
+
+    def record_error(self, resource, error):
+        pass
+
+    def record_retry(self, resource, delay):
+        pass
+
+    def record_limit_sleep(self, resource, seconds):
+        pass
+
+    def record_decode(self, resource, seconds):
+        pass
+
+    def record_frame(self, name, seconds):
+        pass
+
+
+class Metrics(NullMetrics):
+    """
+    Per-resource request metrics for a client.
+
+    Tracks request, error, retry and 429 counts, bytes received, and histograms
+    of latency, response size, rate limit sleeps and JSON decode time per
+    resource. DataFrame conversion times are kept apart in `frames`, keyed
+    by client method name, e.g. 'get_stock_candles'.
+
+    Hooks are called as hook(metric, resource, value) for every recorded
+    value, e.g. hook('latency', '/stock/candle', 0.12), to forward them
+    to an external monitoring system. For the 'frame' metric the second
+    argument is the method name.
+    """
+    enabled = True
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self.resources = defaultdict(ResourceMetrics)
+        self.frames = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _emit(self, metric, resource, value):
+        for hook in self.hooks:
+            hook(metric, resource, value)
+
+    def record_request(self, resource, seconds, status, nbytes):
+        with self._lock:
+            m = self.resources[resource]
+            m.requests += 1
+            m.bytes += nbytes
+            if status == 429:
+                m.rate_limited += 1
+            m.latency.observe(seconds)
+            m.size.observe(nbytes)
+        self._emit('latency', resource, seconds)
+        self._emit('bytes', resource, nbytes)
+        if status == 429:
+            self._emit('rate_limited', resource, 1)
+
+    def record_error(self, resource, error):
+        with self._lock:
+            self.resources[resource].errors += 1
+        self._emit('error', resource, error)
+
+    def record_retry(self, resource, delay):
+        with self._lock:
+            self.resources[resource].retries += 1
+        self._emit('retry', resource, delay)
+
+    def record_limit_sleep(self, resource, seconds):
+        with self._lock:
+            self.resources[resource].limit_sleep.observe(seconds)
+        self._emit('limit_sleep', resource, seconds)
+
+    def record_decode(self, resource, seconds):
+        with self._lock:
+            self.resources[resource].decode.observe(seconds)
+        self._emit('decode', resource, seconds)
+
+    def record_frame(self, name, seconds):
+        with self._lock:
+            self.frames[name].observe(seconds)
+        self._emit('frame', name, seconds)
+
+    def snapshot(self):
+        """All metrics as a plain dict keyed by resource."""
+        with self._lock:
+            return {resource: m.to_dict() for resource, m in self.resources.items()}
+
+    def frame_snapshot(self):
+        """DataFrame conversion times as a plain dict keyed by method name."""
+        with self._lock:
+            return {name: h.to_dict() for name, h in self.frames.items()}
+
+    def reset(self):
+        with self._lock:
+            self.resources.clear()
+            self.frames.clear()
@@ -0,0 +1,136 @@
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from finnhub_python.utils import get_formatted_dates
+
+log = logging.getLogger(__name__)
+
+
+class SeenIds(object):
+    """
+    Set of the most recently seen ids, holding at most `maxsize`.
+    The oldest ids are forgotten first.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, item):
+        return item in self._ids
+
+    def add(self, item):
+        """Remember `item`, True if it was not seen before."""
+        if item in self._ids:
+            self._ids.move_to_end(item)
+            return False
+        self._ids[item] = None
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+        return True
+
+
+class NewsPoller(object):
+    """
+    Polls market news by category and company news by symbol and yields
+    only articles that were not seen before.
+
+    Each category and symbol keeps a high-water mark in `watermarks`:
+    the largest news id for categories, passed as minId so only newer
+    articles are sent, and the latest article time for symbols, which
+    bounds the date range asked for. Articles are also deduplicated by
+    id in a bounded SeenIds.
+
+    Polls are spread evenly over time: every target is polled once per
+    `interval` seconds, or less often when that would take more than
+    `calls_per_minute` of the rate budget.
+
+        poller = NewsPoller(client, categories=['general', 'forex'], symbols=['AAPL'])
+        for article in poller:
+            ...
+
+    :param client: FinnHubClient
+    :param watermarks: dict from a previous poller's `watermarks`, to resume.
+    :param lookback_days: days of company news asked for on the first poll.
+    :param calls_per_minute: share of the rate budget used, defaults to
+        half of the client's default budget.
+    """
+
+    def __init__(self, client, categories=('general',), symbols=(), interval=5.0,
+                 watermarks=None, max_seen=100000, lookback_days=1, calls_per_minute=None):
+        self.client = client
+        self.targets = ['category:{}'.format(c) for c in categories]
+        self.targets += ['symbol:{}'.format(s) for s in symbols]
+        self.watermarks = dict(watermarks or {})
+        self.seen = SeenIds(max_seen)
+        self.lookback_days = lookback_days
+        if calls_per_minute is None:
+            calls_per_minute = client.RATE_LIMITS.get('default', 60) / 2.0
+        # Seconds between two polls of the same target
+        self.period = max(interval, len(self.targets) * 60.0 / calls_per_minute)
+        self.polls = 0
+        self.errors = 0
+        self._stop = threading.Event()
+
+    def poll(self, target):
+        """Request `target` once and return its new articles, oldest first."""
+        kind, name = target.split(':', 1)
+        watermark = self.watermarks.get(target)
+        self.polls += 1
+        try:
+            if kind == 'category':
+                articles = self.client.get_general_news(name, min_id=watermark or 0)
+            else:
+                since = None
+                if watermark is not None:
+                    since = time.strftime('%Y-%m-%d', time.gmtime(watermark))
+                start, end = get_formatted_dates(start_date=since, lookback_days=self.lookback_days)
+                articles = self.client.get_company_news(name, start, end)
+        except Exception as e:
+            self.errors += 1
+            log.warning("News poll of {} failed: {!r}".format(target, e))
+            return []
+
+        field = 'id' if kind == 'category' else 'datetime'
+        new = []
+        for article in articles or ():
+            mark = article.get(field, 0)
+            if watermark is not None and (mark <= watermark if kind == 'category' else mark < watermark):
+                continue
+            # The mark moves past articles another target already yielded too
+            self.watermarks[target] = max(self.watermarks.get(target) or 0, mark)
+            if self.seen.add(article.get('id')):
+                new.append(article)
+        new.sort(key=lambda a: (a.get(field, 0), a.get('id', 0)))
+        return new
+
+    def stream(self):
+        """
+        Generator of new articles as they are found, polling until stop()
+        is called. Targets are staggered across one period.
+        """
+        self._stop.clear()
+        start = time.monotonic()
+        step = self.period / max(len(self.targets), 1)
+        schedule = [(start + i * step, i) for i in range(len(self.targets))]
+        heapq.heapify(schedule)
+        while schedule and not self._stop.is_set():
+            due, i = heapq.heappop(schedule)
+            if self._stop.wait(max(due - time.monotonic(), 0)):
+                break
+            for article in self.poll(self.targets[i]):
+                yield article
+            heapq.heappush(schedule, (max(due + self.period, time.monotonic()), i))
+
+    def __iter__(self):
+        return self.stream()
+
+    def stop(self):
+        """Make stream() return after the current poll."""
+        self._stop.set()
@@ -1,23 +1,116 @@
+import numpy as np
 import pandas as pd
 
+from finnhub_python import analytics
 from finnhub_python.utils import RequestCache
 
 
+def _build_frame(chain):
+    """
+    One frame of every contract sorted by (expiry, side, strike), and
+    the number of rows of each (expiry, side) block.
+    """
+    records, expiries, sides, counts = [], [], [], {}
+    for expiry_chain in chain:
+        expiry = expiry_chain['expirationDate']
+        for side, opts in expiry_chain['options'].items():
+            records.extend(opts)
+            expiries.extend([expiry] * len(opts))
+            sides.extend([side] * len(opts))
+            counts[(expiry, side)] = counts.get((expiry, side), 0) + len(opts)
+
+    df = pd.DataFrame(records)
+    if len(df):
+        expiries, sides = np.array(expiries), np.array(sides)
+        order = np.lexsort((df['strike'].to_numpy(), sides, expiries))
+        df = df.take(order).reset_index(drop=True)
+        if 'expirationDate' not in df:
+            df['expirationDate'] = expiries[order]
+        if 'type' not in df:
+            df['type'] = sides[order]
+    return df, counts
+
+
+def option_chain_columns(data):
+    """
+    Decode an option chain response into compact parts that are cheap
+    to send between processes: the response without its 'data' field,
+    {column: numpy array} in to_frame() order, and the row count of each
+    (expiry, side). Text columns become fixed width unicode arrays instead
+    of arrays of Python objects. FinnHubOptionChain.from_columns
+    rebuilds the chain.
+    """
+    df, counts = _build_frame(data['data'])
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if values.dtype == object and all(isinstance(v, str) for v in values):
+            values = values.astype(str)
+        columns[name] = values
+    meta = {k: v for k, v in data.items() if k != 'data'}
+    return meta, columns, counts
+
+
 class FinnHubOptionChain(RequestCache):
     """
     Wrapper class for option chain data returned
     by FinnHubs api.
     """
 
+    # Option data is decoded once into a single frame sorted by
+    # (expiry, side, strike). Each (expiry, side) pair is a contiguous
+    # block of rows, so per-expiry views are slices of that frame and
+    # single contracts are found through a dict lookup into its columns.
+
     def __init__(self, data):
         super(FinnHubOptionChain, self).__init__(data)
-        self.chain = data['data']
-        self.expirations = [i['expirationDate'] for i in self.chain]
+        self._chain = data['data']
+        self.expirations = [i['expirationDate'] for i in self._chain]
+        self._by_expiry_map = None
         self._frame = None
+        self._slices = None
+        self._rows = None
+        self._columns = None
+        self._views = {}
+
+    @classmethod
+    def from_columns(cls, data, columns, counts):
+        """
+        Chain built from the output of option_chain_columns, e.g. computed
+        in another process. `data` holds the response without its 'data'
+        field, the per-expiry option lists are only rebuilt if asked for.
+        """
+        self = cls.__new__(cls)
+        RequestCache.__init__(self, data)
+        self._chain = None
+        self._by_expiry_map = None
+        self._set_frame(pd.DataFrame(columns, copy=False), counts)
+        self.expirations = list(dict.fromkeys(e for e, _ in sorted(counts)))
+        self._views = {}
+        return self
 
     def __repr__(self):
         return '<{} OptionChain: {}>'.format(self.underlying_symbol, str(self.download_date))
 
+    @property
+    def chain(self):
+        if self._chain is None:
+            self._chain = []
+            for expiry in self.expirations:
+                options = {}
+                for side in ('CALL', 'PUT'):
+                    lo, hi = self._slices.get((expiry, side), (0, 0))
+                    if hi > lo:
+                        options[side] = self._frame.iloc[lo:hi].to_dict('records')
+                self._chain.append({'expirationDate': expiry, 'options': options})
+        return self._chain
+
+    @property
+    def _by_expiry(self):
+        if self._by_expiry_map is None:
+            self._by_expiry_map = {i['expirationDate']: i['options'] for i in self.chain}
+        return self._by_expiry_map
+
     @property
     def underlying_symbol(self):
         return self.data['code']
@@ -34,9 +127,39 @@ class FinnHubOptionChain(RequestCache):
     def exchange(self):
         return self.data['exchange']
 
+    def _build(self):
+        self._set_frame(*_build_frame(self._chain))
+
+    def _set_frame(self, df, counts):
+        self._frame = df
+        self._rows = None
+        self._columns = None
+        self._slices = {}
+        offset = 0
+        for key in sorted(counts):
+            self._slices[key] = (offset, offset + counts[key])
+            offset += counts[key]
+
+    def _row_index(self):
+        """
+        {(expiry, side, strike): row of to_frame()}, built on first use.
+        Strikes listed more than once for an expiry and side map to None.
+        """
+        if self._rows is None:
+            df = self.to_frame()
+            strikes = df['strike'].tolist() if len(df) else []
+            rows = {}
+            for (expiry, side), (lo, hi) in self._slices.items():
+                for row in range(lo, hi):
+                    key = (expiry, side, strikes[row])
+                    rows[key] = None if key in rows else row
+            self._columns = [(name, df[name].to_numpy()) for name in df.columns]
+            self._rows = rows
+        return self._rows
+
     def to_frame(self):
         if self._frame is None:
-            self._frame = pd.DataFrame(self.to_list())
+            self._build()
         return self._frame
 
     def to_list(self):
@@ -48,15 +171,53 @@ class FinnHubOptionChain(RequestCache):
         return all_opts
 
     def get_expiry(self, expiry):
-        for opts in self.chain:
-            if opts['expirationDate'] == expiry:
-                return opts['options']
-        raise ValueError('Invalid expiry. valid dates = {}'.format(self.expirations))
+        self._check_expiry(expiry)
+        return self._by_expiry[expiry]
+
+    def _check_expiry(self, expiry):
+        if expiry not in self.expirations:
+            raise ValueError('Invalid expiry. valid dates = {}'.format(self.expirations))
 
     def _get_side(self, expiry, side):
         opts = self.get_expiry(expiry)
         return opts[side]
 
+    def _side_slice(self, expiry, side):
+        self._check_expiry(expiry)
+        self.to_frame()
+        return self._slices.get((expiry, side), (0, 0))
+
+    def _side_frame(self, expiry, side):
+        key = (expiry, side)
+        if key not in self._views:
+            lo, hi = self._side_slice(expiry, side)
+            view = self.to_frame().iloc[lo:hi]
+            index = pd.Index(view['strike'].to_numpy(), name='strike') if len(view) else view.index
+            self._views[key] = view.set_axis(index, axis=0)
+        return self._views[key]
+
+    def get_column(self, name, expiry=None, side=None):
+        """
+        A single field as a numpy array, optionally restricted to one
+        expiration and side. Restricted arrays are views, not copies.
+
+        :param name: str, column name e.g. 'strike' or 'impliedVolatility'
+        :param expiry: str, date
+        :param side: str, 'CALL' or 'PUT'
+        :return: numpy.ndarray
+        """
+        values = self.to_frame()[name].to_numpy()
+        if expiry is None:
+            return values
+        if side is None:
+            bounds = [b for b in (self._side_slice(expiry, s) for s in ('CALL', 'PUT')) if b[1] > b[0]]
+            if not bounds:
+                return values[:0]
+            lo, hi = min(b[0] for b in bounds), max(b[1] for b in bounds)
+        else:
+            lo, hi = self._side_slice(expiry, side.upper())
+        return values[lo:hi]
+
     def get_calls(self, expiry):
         """
         Get a dataframe of calls for an expiration.
@@ -65,10 +226,7 @@ class FinnHubOptionChain(RequestCache):
         :param expiry: str, date
         :return: pandas.DataFrame
         """
-        opts = self._get_side(expiry, 'CALL')
-        df = pd.DataFrame(opts)
-        df.index = df.strike
-        return df
+        return self._side_frame(expiry, 'CALL')
 
     def get_puts(self, expiry):
         """
@@ -78,10 +236,7 @@ class FinnHubOptionChain(RequestCache):
         :param expiry: str, date
         :return: pandas.DataFrame
         """
-        opts = self._get_side(expiry, 'PUT')
-        df = pd.DataFrame(opts)
-        df.index = df.strike
-        return df
+        return self._side_frame(expiry, 'PUT')
 
     def all_calls(self):
         calls = []
@@ -100,11 +255,73 @@ class FinnHubOptionChain(RequestCache):
         return puts
 
     def get_option(self, expiry, side, strike):
-        """ Get a single option row """
-        if side.upper() == 'CALL':
-            opts = self.get_calls(expiry)
-        elif side.upper() == 'PUT':
-            opts = self.get_puts(expiry)
-        else:
+        """
+        Get a single option row as a dict {column: value}, read straight
+        from the columns of to_frame().
+
+        Raises ValueError when the chain lists the strike more than once
+        for that expiry and side; get_calls and get_puts return them all.
+        """
+        side = side.upper()
+        if side not in ('CALL', 'PUT'):
             raise ValueError('Invalid Option Side: {}'.format(side))
-        return opts.loc[strike]
+        self._check_expiry(expiry)
+        try:
+            row = self._row_index()[(expiry, side, strike)]
+        except KeyError:
+            raise KeyError(strike)
+        if row is None:
+            raise ValueError('Strike {} is listed more than once for {} {}'.format(strike, expiry, side))
+        return {name: values[row] for name, values in self._columns}
+
+    def _option_prices(self, price):
+        df = self.to_frame()
+        if price != 'mid':
+            return df[price].to_numpy(dtype='float64')
+        last = df['lastPrice'].to_numpy(dtype='float64')
+        if 'bid' not in df or 'ask' not in df:
+            return last
+        bid = df['bid'].to_numpy(dtype='float64')
+        ask = df['ask'].to_numpy(dtype='float64')
+        quoted = (bid > 0) & (ask > 0)
+        return np.where(quoted, 0.5 * (bid + ask), last)
+
+    def analytics(self, rate=0.0, dividend_yield=0.0, price='mid', valuation_date=None):
+        """
+        Implied volatility and greeks for every contract in the chain,
+        computed in one vectorized pass.
+
+        :param rate: float, continuously compounded risk free rate
+        :param dividend_yield: float, continuous dividend yield
+        :param price: str, 'mid' for the bid/ask midpoint (lastPrice when
+            either side is missing) or the name of a price column
+        :param valuation_date: str, date. Defaults to the underlying's last trade date.
+        :return: pandas.DataFrame aligned with to_frame() with columns
+            time_to_expiry (years), moneyness (strike / spot), iv,
+            delta, gamma, vega (per vol point) and theta (per day)
+        """
+        df = self.to_frame()
+        if valuation_date is None:
+            valuation_date = self.underlying_last_trade_date
+        spot = float(self.underlying_price)
+        strike = df['strike'].to_numpy(dtype='float64')
+        is_call = df['type'].to_numpy() == 'CALL'
+        expiry = pd.to_datetime(df['expirationDate']).to_numpy(dtype='datetime64[D]')
+        valuation = np.datetime64(pd.Timestamp(valuation_date).date(), 'D')
+        days = (expiry - valuation).astype('int64')
+        T = days / analytics.DAYS_PER_YEAR
+
+        iv = analytics.implied_volatility(
+            self._option_prices(price), spot, strike, T, is_call,
+            r=rate, q=dividend_yield)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g = analytics.greeks(spot, strike, T, iv, is_call, r=rate, q=dividend_yield)
+
+        out = pd.DataFrame({
+            'time_to_expiry': T,
+            'moneyness': strike / spot,
+            'iv': iv,
+        }, index=df.index)
+        for name, values in g.items():
+            out[name] = values
+        return out
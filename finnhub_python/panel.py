@@ -0,0 +1,113 @@
+import numpy as np
+
+FIELDS = ('o', 'h', 'l', 'c', 'v')
+FIELD_NAMES = {'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c', 'volume': 'v'}
+
+
+class CandlePanel(object):
+    """
+    Candles of many symbols aligned on one UTC time index.
+
+    Each field is a contiguous float64 block of shape (times, symbols),
+    so a row is a cross section at one bar time. Bars a symbol does not
+    have are NaN in every block and False in `mask`.
+
+    index: datetime64[s] array, sorted union of every symbol's bar times.
+    symbols: column labels, in the order they were requested.
+    mask: bool block, True where the symbol has a bar.
+    errors: {symbol: exception} for symbols whose request failed.
+        Their columns are empty.
+    """
+
+    def __init__(self, index, symbols, blocks, mask, errors=None):
+        self.index = index
+        self.symbols = list(symbols)
+        self.blocks = blocks
+        self.mask = mask
+        self.errors = dict(errors or {})
+        self._columns = {s: i for i, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_bars(cls, bars_by_symbol, symbols=None):
+        """
+        Build a panel from {symbol: candle response}. Responses may be the
+        json payload or the arrays from to_ohlcv_arrays. Exceptions and
+        empty responses give an empty column.
+
+        :param symbols: column order, defaults to the order of the dict.
+        """
+        if symbols is None:
+            symbols = list(bars_by_symbol)
+        errors = {}
+        times = {}
+        for symbol in symbols:
+            bars = bars_by_symbol.get(symbol)
+            if isinstance(bars, Exception):
+                errors[symbol] = bars
+            elif bars and len(bars.get('t', ())):
+                t = np.asarray(bars['t'])
+                if t.dtype.kind == 'M':
+                    t = t.astype('datetime64[s]').astype('int64')
+                times[symbol] = t.astype('int64', copy=False)
+
+        if times:
+            index = np.unique(np.concatenate(list(times.values())))
+        else:
+            index = np.empty(0, dtype='int64')
+
+        shape = (len(index), len(symbols))
+        blocks = {f: np.full(shape, np.nan) for f in FIELDS}
+        mask = np.zeros(shape, dtype=bool)
+        for j, symbol in enumerate(symbols):
+            t = times.get(symbol)
+            if t is None:
+                continue
+            rows = np.searchsorted(index, t)
+            mask[rows, j] = True
+            bars = bars_by_symbol[symbol]
+            for f in FIELDS:
+                if f in bars:
+                    blocks[f][rows, j] = bars[f]
+        return cls(index.astype('datetime64[s]'), symbols, blocks, mask, errors)
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, field):
+        """Block of a field, by its candle key ('c') or name ('close')."""
+        return self.blocks[FIELD_NAMES.get(field, field)]
+
+    @property
+    def open(self):
+        return self.blocks['o']
+
+    @property
+    def high(self):
+        return self.blocks['h']
+
+    @property
+    def low(self):
+        return self.blocks['l']
+
+    @property
+    def close(self):
+        return self.blocks['c']
+
+    @property
+    def volume(self):
+        return self.blocks['v']
+
+    def column(self, symbol):
+        """Position of `symbol` in the blocks."""
+        return self._columns[symbol]
+
+    def to_frame(self, field='c'):
+        """DataFrame of one field, indexed by UTC bar time with a column per symbol."""
+        import pandas as pd
+
+        index = pd.DatetimeIndex(self.index, name='t').tz_localize('utc')
+        return pd.DataFrame(self[field], index=index, columns=self.symbols, copy=False)
@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per `per` seconds up to `capacity`.
+    Callers reserve a token up front; when the bucket is empty the balance
+    goes negative and each caller is told how long to wait for its slot,
+    so concurrent threads are admitted one after another at the allowed
+    rate instead of all waking up together.
+    """
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = float(rate) / per
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<TokenBucket {:.2f}/s tokens={:.2f}>'.format(self.rate, self.tokens)
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """
+        Take a token and return the number of seconds the caller
+        must wait before sending its request.
+        """
+        with self._lock:
+            self._refill(time.time())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block until a token is available. Returns the time slept."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def sync(self, remaining, reset_ts=None):
+        """
+        Resync with the quota reported by the server.
+
+        The local balance never goes above `remaining`. When the server
+        reports no calls left, the next slot is pushed back to `reset_ts`.
+        """
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset_ts is not None:
+                backlog = max(reset_ts - now, 0) * self.rate
+                self.tokens = min(self.tokens, -backlog)
+
+
+class RateLimiter(object):
+    """
+    Token bucket scheduler with separate budgets per endpoint group.
+
+    `budgets` maps a resource prefix to the number of calls allowed
+    per `per` seconds. The longest matching prefix wins and the
+    'default' entry covers everything else.
+    """
+
+    def __init__(self, budgets=None, per=60.0, burst=None):
+        if budgets is None:
+            budgets = {'default': 60}
+        self.buckets = {}
+        for prefix, rate in budgets.items():
+            capacity = None if burst is None else min(burst, rate)
+            self.buckets[prefix] = TokenBucket(rate, per=per, capacity=capacity)
+        self._prefixes = sorted(
+            (p for p in self.buckets if p != 'default'), key=len, reverse=True)
+
+    def bucket_for(self, resource):
+        for prefix in self._prefixes:
+            if resource.startswith(prefix):
+                return self.buckets[prefix]
+        return self.buckets['default']
+
+    def reserve(self, resource=''):
+        return self.bucket_for(resource).reserve()
+
+    def acquire(self, resource=''):
+        return self.bucket_for(resource).acquire()
+
+    def sync(self, resource, headers, key=None):
+        """
+        Resync the bucket serving `resource` from response headers.
+        `key` is accepted for compatibility with SharedRateLimiter.
+        """
+        if not headers or 'X-Ratelimit-Remaining' not in headers:
+            return
+        reset_ts = headers.get('X-Ratelimit-Reset')
+        self.bucket_for(resource).sync(
+            int(headers['X-Ratelimit-Remaining']),
+            int(reset_ts) if reset_ts is not None else None)
+
+    def block(self, resource, reset_ts, key=None):
+        """Stop admitting calls to `resource` until `reset_ts` (e.g. after a 429)."""
+        self.bucket_for(resource).sync(0, reset_ts)
+
+
+class SharedRateLimiter(object):
+    """
+    Rate limiter whose budgets are shared by every process on the host.
+
+    Buckets live in a SQLite file and are updated in one write-locked
+    transaction per call, so clients in different processes pointing at
+    the same `path` draw from the same quota instead of each assuming
+    they own all of it.
+
+    With `api_keys`, each key gets its own set of budgets and every call
+    is routed to the key with the most tokens left, so throughput grows
+    with the number of keys. Clients then send whichever key the limiter
+    picked instead of their own.
+
+    :param path: SQLite file, defaults to ~/.finnhub_python/quota.sqlite
+    :param budgets: as for RateLimiter, applied per key. Defaults to
+        FinnHubBase.RATE_LIMITS, and `burst` to FinnHubBase.RATE_LIMIT_BURST.
+    :param api_keys: optional list of api keys to share calls between.
+        Without it, all clients using the file are assumed to share one key.
+    """
+
+    # Calls wait on a lock shared with other processes, so the async
+    # client makes them from a worker thread
+    blocking = True
+
+    def __init__(self, path=None, budgets=None, per=60.0, burst=None, api_keys=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.finnhub_python', 'quota.sqlite')
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        if budgets is None or burst is None:
+            # Same budgets as the limiter a client builds for itself
+            from finnhub_python.base import FinnHubBase
+            if budgets is None:
+                budgets = FinnHubBase.RATE_LIMITS
+            if burst is None:
+                burst = FinnHubBase.RATE_LIMIT_BURST
+        self.path = path
+        self.api_keys = list(api_keys or [])
+        # prefix: (tokens per second, capacity)
+        self.budgets = {}
+        for prefix, rate in budgets.items():
+            capacity = rate if burst is None else min(burst, rate)
+            self.budgets[prefix] = (float(rate) / per, float(capacity))
+        self._prefixes = sorted(
+            (p for p in self.budgets if p != 'default'), key=len, reverse=True)
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (api_key TEXT, prefix TEXT, '
+                'tokens REAL, updated REAL, PRIMARY KEY (api_key, prefix))')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _conn(self):
+        # Connections are per thread, and never reused in a forked child
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, serializing all processes
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def prefix_for(self, resource):
+        for prefix in self._prefixes:
+            if resource.startswith(prefix):
+                return prefix
+        return 'default'
+
+    def _tokens(self, conn, key, prefix, now):
+        """Refilled token count of a bucket."""
+        rate, capacity = self.budgets[prefix]
+        row = conn.execute(
+            'SELECT tokens, updated FROM buckets WHERE api_key = ? AND prefix = ?',
+            (key, prefix)).fetchone()
+        if row is None:
+            return capacity
+        tokens, updated = row
+        return min(capacity, tokens + max(now - updated, 0) * rate)
+
+    def _store(self, conn, key, prefix, tokens, now):
+        conn.execute('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)',
+                     (key, prefix, tokens, now))
+
+    def _take(self, conn, key, prefix, now):
+        tokens = self._tokens(conn, key, prefix, now) - 1
+        self._store(conn, key, prefix, tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self.budgets[prefix][0]
+
+    def reserve_key(self, resource=''):
+        """
+        Take a token from the key with the most left and return
+        (api key, seconds to wait before sending).
+        """
+        prefix = self.prefix_for(resource)
+        keys = self.api_keys or ['']
+        with self._transaction() as conn:
+            now = time.time()
+            key = max(keys, key=lambda k: self._tokens(conn, k, prefix, now))
+            return key, self._take(conn, key, prefix, now)
+
+    def acquire_key(self, resource=''):
+        """Block until a key has a token. Returns (api key, time slept)."""
+        key, wait = self.reserve_key(resource)
+        if wait > 0:
+            time.sleep(wait)
+        return key, wait
+
+    def reserve(self, resource=''):
+        return self.reserve_key(resource)[1]
+
+    def acquire(self, resource=''):
+        return self.acquire_key(resource)[1]
+
+    def _bucket_key(self, key):
+        # Without a key pool every client shares the one set of buckets
+        return key if key in self.api_keys else ''
+
+    def _sync(self, key, resource, remaining, reset_ts):
+        prefix = self.prefix_for(resource)
+        with self._transaction() as conn:
+            now = time.time()
+            tokens = min(self._tokens(conn, key, prefix, now), float(remaining))
+            if remaining <= 0 and reset_ts is not None:
+                tokens = min(tokens, -max(reset_ts - now, 0) * self.budgets[prefix][0])
+            self._store(conn, key, prefix, tokens, now)
+
+    def sync(self, resource, headers, key=None):
+        """Resync the bucket of `key` serving `resource` from response headers."""
+        if not headers or 'X-Ratelimit-Remaining' not in headers:
+            return
+        reset_ts = headers.get('X-Ratelimit-Reset')
+        self._sync(self._bucket_key(key), resource, int(headers['X-Ratelimit-Remaining']),
+                   int(reset_ts) if reset_ts is not None else None)
+
+    def block(self, resource, reset_ts, key=None):
+        """Stop admitting calls to `resource` with `key` until `reset_ts`."""
+        self._sync(self._bucket_key(key), resource, 0, reset_ts)
+
+    def clear(self):
+        """Forget every bucket, e.g. after changing budgets."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM buckets')
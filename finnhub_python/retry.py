@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+
+# HTTP statuses that are worth sending again
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a resource whose circuit is open."""
+
+    def __init__(self, resource, retry_in):
+        super(CircuitOpenError, self).__init__(
+            'Circuit open for {}, retry in {:.1f} seconds'.format(resource, retry_in))
+        self.resource = resource
+        self.retry_in = retry_in
+
+
+class RetryPolicy(object):
+    """
+    When and how long to wait before sending a failed request again.
+
+    Connection errors, timeouts and the HTTP `statuses` are retried up to
+    `max_retries` times. Waits follow the server when it says how long
+    (Retry-After, or X-Ratelimit-Reset once the quota is used up), plus a
+    little jitter. Otherwise the n-th retry waits a random time of up to
+    backoff_base * 2 ** n seconds, capped at `backoff_max`, so workers
+    failing together do not all retry together.
+    """
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30.0, statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.statuses = frozenset(statuses)
+
+    def retries_status(self, status):
+        return status in self.statuses
+
+    def backoff(self, attempt):
+        """Full jitter exponential backoff for retry number `attempt` (from 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def jitter(self):
+        return random.uniform(0, self.backoff_base)
+
+    @staticmethod
+    def server_wait(headers, now=None):
+        """Seconds the server asked to wait before the next call, or None."""
+        if not headers:
+            return None
+        if now is None:
+            now = time.time()
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(retry_after).timestamp() - now, 0.0)
+                except (TypeError, ValueError):
+                    pass
+        reset = headers.get('X-Ratelimit-Reset')
+        if reset is not None and headers.get('X-Ratelimit-Remaining') == '0':
+            try:
+                return max(float(reset) - now, 0.0)
+            except ValueError:
+                pass
+        return None
+
+
+class CircuitBreaker(object):
+    """
+    Thread-safe circuit breaker keyed by resource.
+
+    After `failure_threshold` consecutive failed calls to a resource its
+    circuit opens, and calls fail fast with CircuitOpenError for
+    `recovery_time` seconds. Then a single trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_time=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._failures = defaultdict(int)
+        self._opened = {}
+        self._trials = set()
+        self._lock = threading.Lock()
+
+    def state(self, resource):
+        """'closed', 'open' or 'half-open'."""
+        with self._lock:
+            if resource not in self._opened:
+                return 'closed'
+            return 'half-open' if resource in self._trials else 'open'
+
+    def check(self, resource):
+        """Raise CircuitOpenError unless a call to `resource` may be sent."""
+        with self._lock:
+            opened = self._opened.get(resource)
+            if opened is None:
+                return
+            retry_in = opened + self.recovery_time - time.time()
+            if retry_in > 0 or resource in self._trials:
+                raise CircuitOpenError(resource, max(retry_in, 0.0))
+            self._trials.add(resource)
+
+    def record_success(self, resource):
+        with self._lock:
+            self._failures.pop(resource, None)
+            self._opened.pop(resource, None)
+            self._trials.discard(resource)
+
+    def record_failure(self, resource):
+        with self._lock:
+            self._failures[resource] += 1
+            if resource in self._trials or self._failures[resource] >= self.failure_threshold:
+                self._opened[resource] = time.time()
+                self._trials.discard(resource)
@@ -1,32 +1,421 @@
 """
-Example usage of Finnhub socket API.
+Finnhub socket API streaming and tick recording.
 """
 
 from __future__ import print_function # Py2 compat
+import os
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Py2 compat
+    import Queue as queue
+
 import websocket
 from finnhub_python.utils import get_finnhub_api_key
 
+SOCKET_URI = "wss://ws.finnhub.io"
+
+
+class TickRecorder(object):
+    """
+    Buffered writer for raw websocket messages.
+
+    Messages are put on a bounded in-memory queue and written by a
+    background thread in batches, flushed once `batch_size` messages are
+    waiting or `flush_interval` seconds have passed. The output file is
+    kept open between batches. When the queue is full new messages are
+    dropped and counted rather than blocking the socket thread.
+
+    :param fname: str: output file
+    :param max_queue: int: messages buffered before dropping
+    :param batch_size: int: messages written per flush
+    :param flush_interval: float: max seconds a message waits to be written
+    :param max_bytes: int: rotate the file once it reaches this size (None = never)
+    :param backup_count: int: rotated files kept as fname.1 ... fname.N
+    """
+
+    def __init__(self, fname='raw_ticks.txt', max_queue=100000, batch_size=1000,
+                 flush_interval=1.0, max_bytes=None, backup_count=5):
+        self.fname = fname
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'received': self.received,
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'rotations': self.rotations,
+        }
+
+    def put(self, message):
+        """Queue a message without blocking. Returns False if it was dropped."""
+        self.received += 1
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._file = open(self.fname, 'a')
+            self._thread = threading.Thread(target=self._run, name='TickRecorder')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Write out everything still queued and close the file."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.time(), 0.01)))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.time() >= deadline:
+                self._write(batch)
+                batch = []
+                deadline = time.time() + self.flush_interval
+        self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        self._file.write('\n'.join(batch) + '\n')
+        self._file.flush()
+        self.written += len(batch)
+        self.batches += 1
+        if self.max_bytes is not None and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = '{}.{}'.format(self.fname, i)
+                if os.path.exists(src):
+                    os.replace(src, '{}.{}'.format(self.fname, i + 1))
+            os.replace(self.fname, self.fname + '.1')
+        else:
+            os.remove(self.fname)
+        self._file = open(self.fname, 'a')
+        self.rotations += 1
+
+
+class FinnHubSocket(object):
+    """
+    A single websocket connection subscribed to a list of symbols.
+    Every raw message is passed to `on_message(message)`.
+    """
+
+    def __init__(self, symbols, on_message, token=None, uri=SOCKET_URI):
+        if token is None:
+            token = get_finnhub_api_key()
+        self.symbols = list(symbols)
+        self.handler = on_message
+        self.uri = uri
+        self.token = token
+        self.ws = None
+
+    def _on_message(self, ws, message):
+        self.handler(message)
+
+    def _on_error(self, ws, error):
+        print(error)
+
+    def _on_close(self, ws, *args):
+        print("### closed ###")
+
+    def _on_open(self, ws):
+        for symbol in self.symbols:
+            subscribe(ws, symbol)
+
+    def run_forever(self, **kwargs):
+        self.ws = websocket.WebSocketApp("{}?token={}".format(self.uri, self.token),
+                                         on_message=self._on_message,
+                                         on_error=self._on_error,
+                                         on_close=self._on_close,
+                                         on_open=self._on_open)
+        self.ws.run_forever(**kwargs)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
 
-def write_line(data, fname):
-    with open(fname, 'a+') as f:
-        f.write(data + '\n')
 
+class _SocketShard(object):
+    """
+    One websocket connection owned by a FinnHubSocketManager.
+    Reconnects with jittered exponential backoff until stopped and
+    resubscribes its symbols every time the connection opens.
+    """
 
-def on_message(ws, message):
-    write_line(message, tick_file)
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.symbols = set()
+        self.reconnects = 0
+        self.ws = None
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='FinnHubSocket-{}'.format(index))
+        self._thread.daemon = True
 
+    def start(self):
+        self._thread.start()
 
-def on_error(ws, error):
-    print(error)
+    def add(self, symbol):
+        with self._lock:
+            self.symbols.add(symbol)
+        self._send(subscribe, symbol)
 
+    def remove(self, symbol):
+        with self._lock:
+            self.symbols.discard(symbol)
+        self._send(unsubscribe, symbol)
 
-def on_close(ws):
-    print("### closed ###")
+    def _send(self, action, symbol):
+        if self.connected.is_set():
+            try:
+                action(self.ws, symbol)
+            except websocket.WebSocketException:
+                # The symbol is resubscribed when the connection reopens
+                pass
 
+    def _on_open(self, ws):
+        if self.manager._stopped.is_set():
+            # Stopped while connecting
+            ws.close()
+            return
+        self.connected.set()
+        self._attempt = 0
+        with self._lock:
+            symbols = list(self.symbols)
+        for symbol in symbols:
+            subscribe(ws, symbol)
 
-def on_open(ws):
-    for symbol in SYMBOLS:
-        subscribe(ws, symbol)
+    def _on_message(self, ws, message):
+        self.manager._put(message)
+
+    def _on_error(self, ws, error):
+        self.manager._count('errors')
+
+    def _on_close(self, ws, *args):
+        self.connected.clear()
+
+    def _run(self):
+        manager = self.manager
+        self._attempt = 0
+        while not manager._stopped.is_set():
+            self.ws = websocket.WebSocketApp(manager.url,
+                                             on_open=self._on_open,
+                                             on_message=self._on_message,
+                                             on_error=self._on_error,
+                                             on_close=self._on_close)
+            self.ws.run_forever(**manager.run_kwargs)
+            self.connected.clear()
+            if manager._stopped.is_set():
+                break
+            delay = min(manager.backoff_max, manager.backoff_base * 2 ** self._attempt)
+            self._attempt += 1
+            self.reconnects += 1
+            manager._stopped.wait(random.uniform(0, delay))
+
+    def close(self, timeout=None):
+        ws = self.ws
+        if ws is not None:
+            ws.keep_running = False
+            # Only ask the server to close: the shard's thread reads its
+            # reply and returns from run_forever. Closing the socket from
+            # this thread can leave that thread waiting on it for good.
+            try:
+                ws.sock.send_close()
+            except (AttributeError, websocket.WebSocketException, OSError):
+                pass
+        # Shards of a manager that was never started have no thread to join
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+
+class FinnHubSocketManager(object):
+    """
+    Streams trades for a large symbol universe over several websocket
+    connections.
+
+    Symbols are spread over connections holding at most
+    `symbols_per_connection` each, and can be added or removed at any time.
+    Dropped connections reconnect on their own with jittered exponential
+    backoff and resubscribe their symbols. Messages from every connection
+    go onto one bounded queue. When the consumer falls behind, a message
+    waits at most `put_timeout` seconds for room and is then dropped and
+    counted, so a slow consumer never stalls the sockets.
+
+    :param symbols: iterable of symbols to subscribe on start
+    :param token: str: api key, defaults to FINNHUB_API_KEY
+    :param symbols_per_connection: int
+    :param max_queue: int: messages buffered for the consumer
+    :param put_timeout: float: seconds a socket waits on a full queue
+    :param backoff_base: float: first reconnect delay cap in seconds
+    :param backoff_max: float: largest reconnect delay cap in seconds
+    :param run_kwargs: passed to WebSocketApp.run_forever, e.g. ping_interval
+    """
+
+    def __init__(self, symbols=(), token=None, uri=SOCKET_URI, symbols_per_connection=50,
+                 max_queue=100000, put_timeout=0.0, backoff_base=1.0, backoff_max=60.0,
+                 **run_kwargs):
+        if token is None:
+            token = get_finnhub_api_key()
+        self.url = "{}?token={}".format(uri, token)
+        self.symbols_per_connection = symbols_per_connection
+        self.put_timeout = put_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.run_kwargs = run_kwargs
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.shards = []
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        # Counters are updated from every shard's thread
+        self._counts_lock = threading.Lock()
+        for symbol in symbols:
+            self.subscribe(symbol)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        with self._lock:
+            self._started = True
+            for shard in self.shards:
+                if not shard._thread.is_alive():
+                    shard.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        for shard in self.shards:
+            shard.close(timeout)
+
+    def _shard_for(self, symbol):
+        for shard in self.shards:
+            if symbol in shard.symbols:
+                return shard
+        return None
+
+    def subscribe(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            if self._shard_for(symbol) is not None:
+                return
+            open_shards = [s for s in self.shards if len(s.symbols) < self.symbols_per_connection]
+            if open_shards:
+                shard = min(open_shards, key=lambda s: len(s.symbols))
+            else:
+                shard = _SocketShard(self, len(self.shards))
+                self.shards.append(shard)
+                if self._started:
+                    shard.start()
+            shard.add(symbol)
+
+    def unsubscribe(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            shard = self._shard_for(symbol)
+            if shard is not None:
+                shard.remove(symbol)
+
+    @property
+    def symbols(self):
+        return sorted(s for shard in self.shards for s in shard.symbols)
+
+    def _count(self, name):
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _put(self, message):
+        self._count('received')
+        try:
+            if self.put_timeout:
+                self._queue.put(message, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(message)
+        except queue.Full:
+            self._count('dropped')
+
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrives within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def messages(self, timeout=1.0):
+        """Iterate over messages until the manager is stopped."""
+        while not (self._stopped.is_set() and self._queue.empty()):
+            message = self.get(timeout)
+            if message is not None:
+                yield message
+
+    def stats(self):
+        with self._counts_lock:
+            received, dropped, errors = self.received, self.dropped, self.errors
+        return {
+            'queue_depth': self._queue.qsize(),
+            'received': received,
+            'dropped': dropped,
+            'errors': errors,
+            'connections': [
+                {'symbols': len(s.symbols), 'connected': s.connected.is_set(),
+                 'reconnects': s.reconnects}
+                for s in self.shards
+            ],
+        }
 
 
 def subscribe(ws, symbol):
@@ -35,8 +424,11 @@ def subscribe(ws, symbol):
     ws.send(req)
 
 
-tick_file = 'raw_ticks.txt'
-token = get_finnhub_api_key()
+def unsubscribe(ws, symbol):
+    template = '{"type":"unsubscribe","symbol":"X"}'
+    req = template.replace('X', symbol.upper())
+    ws.send(req)
+
 
 SYMBOLS = [
     "AAPL",
@@ -48,9 +440,6 @@ SYMBOLS = [
 
 if __name__ == "__main__":
     websocket.enableTrace(True)
-    ws = websocket.WebSocketApp("wss://ws.finnhub.io?token=" + token,
-                                on_message=on_message,
-                                on_error=on_error,
-                                on_close=on_close)
-    ws.on_open = on_open
-    ws.run_forever()
\ No newline at end of file
+    with TickRecorder('raw_ticks.txt') as recorder:
+        FinnHubSocket(SYMBOLS, recorder.put).run_forever()
+        print(recorder.stats())
@@ -1,45 +1,119 @@
 import os
 import json
-import pandas as pd
-import multitasking
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FuturesTimeoutError, as_completed
 
-multitasking.set_max_threads(multitasking.config["CPU_CORES"] * 5)
+# Default number of concurrent calls made by multicall. Clients size
+# their HTTP connection pools to match so no worker waits on a socket.
+MAX_THREADS = (os.cpu_count() or 1) * 5
 
 
-def multicall(func, params, *args, **kwargs):
+def multicall(func, params, *args, max_workers=None, timeout=None, **kwargs):
     """
     Calls the same api function several times
     at once and waits until all tasks complete
     before returning.
 
+    Calls that raise map to the exception instead of a result.
+
     :returns dictionary
-        {parameter: api result}
+        {parameter: api result or exception}, in the order of params
     """
-    out = {}
-    for param in params:
-        out[param] = _multitask(
-            out, func, param, *args, **kwargs
-        )
-    multitasking.wait_for_tasks()
-    return out
+    params = list(params)
+    results = dict(imulticall(
+        func, params, *args, max_workers=max_workers, timeout=timeout, **kwargs
+    ))
+    return {param: results[param] for param in params}
 
 
-@multitasking.task
-def _multitask(out, func, param, *args, **kwargs):
+def imulticall(func, params, *args, max_workers=None, timeout=None, **kwargs):
     """
-    Utility for making the same api call several times
-    at once with different parameters.
+    Streaming version of multicall.
 
-    :param out: dict: container for returned data
     :param func: api method to call
-    :param param: the parameter in the api call that is changing (usually symbols)
+    :param params: the parameters in the api call that are changing (usually symbols)
     :param args: positional arguments for api method
+    :param max_workers: int: concurrent calls for this batch, defaults to MAX_THREADS
+    :param timeout: float: seconds before unfinished calls are abandoned
     :param kwargs: keyword arguments for api method
 
-    :return: None: Only populates the 'out' dictionary
+    :return: MultiCall: iterable of (parameter, result or exception)
+        in completion order
+    """
+    return MultiCall(func, params, args, kwargs, max_workers=max_workers, timeout=timeout)
+
+
+class MultiCall(object):
+    """
+    Runs the same api call for many parameters on a bounded thread pool
+    and yields (parameter, result) pairs as each call completes.
+
+    A call that raises yields its exception in place of the result, so
+    one bad symbol never takes down the batch. Calls still unfinished
+    when `timeout` expires yield a TimeoutError, and calls cancelled
+    with `cancel()` yield a CancelledError.
     """
-    result = func(param, *args, **kwargs)
-    out[param] = result
+
+    def __init__(self, func, params, args=(), kwargs=None,
+                 max_workers=None, timeout=None):
+        self.func = func
+        self.params = list(params)
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.max_workers = max_workers or MAX_THREADS
+        self.timeout = timeout
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cancel()
+
+    def __iter__(self):
+        workers = max(1, min(self.max_workers, len(self.params)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = self._submit(executor)
+        try:
+            try:
+                for future in as_completed(list(futures), timeout=self.timeout):
+                    yield futures.pop(future), self._result(future)
+            except FuturesTimeoutError:
+                for future in list(futures):
+                    future.cancel()
+                    yield futures.pop(future), TimeoutError(
+                        'Batch timed out after {} seconds'.format(self.timeout))
+        finally:
+            self.cancel()
+            executor.shutdown(wait=False)
+
+    def _submit(self, executor):
+        with self._lock:
+            for param in self.params:
+                if self._cancelled:
+                    break
+                future = executor.submit(self.func, param, *self.args, **self.kwargs)
+                self._futures[future] = param
+            return dict(self._futures)
+
+    @staticmethod
+    def _result(future):
+        if future.cancelled():
+            return CancelledError()
+        exc = future.exception()
+        if exc is not None:
+            return exc
+        return future.result()
+
+    def cancel(self):
+        """Cancel every call that has not started yet."""
+        with self._lock:
+            self._cancelled = True
+            for future in self._futures:
+                future.cancel()
 
 
 def get_finnhub_api_key(env=None):
@@ -48,22 +122,40 @@ def get_finnhub_api_key(env=None):
     return env.get('FINNHUB_API_KEY', None)
 
 
+def to_date(value):
+    '''
+    datetime.date for a date, datetime, ISO date string, or anything
+    pandas.Timestamp accepts. pandas is only imported for the last case.
+    '''
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value[:10], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    import pandas as pd
+    return pd.Timestamp(value).date()
+
+
 def get_formatted_dates(start_date=None, end_date=None, lookback_days=7):
     '''
     Returns start and end dates for queries with dates in the proper format
     Default dates are one week ago until today.
 
     '''
-
+    if lookback_days is None:
+        lookback_days = 7
     if end_date is None:
-        end_date = pd.Timestamp.utcnow().strftime('%Y-%m-%d')
+        end_date = datetime.datetime.now(datetime.timezone.utc)
+    end_date = to_date(end_date)
     if start_date is None:
-        start_date = (
-                pd.Timestamp(end_date) - pd.Timedelta(days=lookback_days)
-        ).strftime('%Y-%m-%d')
+        start_date = end_date - datetime.timedelta(days=lookback_days)
     # Ensure proper date string parameters
-    start_date = pd.Timestamp(start_date).strftime('%Y-%m-%d')
-    end_date = pd.Timestamp(end_date).strftime('%Y-%m-%d')
+    start_date = to_date(start_date).strftime('%Y-%m-%d')
+    end_date = end_date.strftime('%Y-%m-%d')
     return start_date, end_date
 
 
@@ -78,7 +170,7 @@ class RequestCache(object):
         self._data = data
         # Inject the original download time if the data was not loaded from a file
         if '_download_date' not in data:
-            data['_download_date'] = pd.Timestamp.utcnow()
+            data['_download_date'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
     @property
     def data(self):
@@ -86,6 +178,7 @@ class RequestCache(object):
 
     @property
     def download_date(self):
+        import pandas as pd
         return pd.Timestamp(self.data['_download_date'])
 
     @classmethod
@@ -19,13 +19,22 @@ setup(
         'Topic :: Scientific/Engineering :: Interface Engine/Protocol Translator',
         'Topic :: Software Development :: Libraries :: Python Modules',
 
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
     platforms=['any'],
+    # Keyword-only arguments, async def and module __getattr__
+    python_requires='>=3.7',
     packages=find_packages(exclude=['contrib', 'docs', 'tests', 'examples']),
+    extras_require={
+        'async': ['aiohttp'],
+        'socket': ['websocket-client'],
+    },
 
 )
@@ -0,0 +1,128 @@
+"""
+FinnHubSocketManager against the local websocket stand-in of the benchmarks.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+from finnhub_python.socket import FinnHubSocketManager  # noqa: E402
+from mock_server import MockFinnHubSocketServer  # noqa: E402
+
+TIMEOUT = 10.0
+
+
+def wait_for(condition, timeout=TIMEOUT):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('Timed out waiting for {}'.format(condition))
+        time.sleep(0.01)
+
+
+class SocketManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockFinnHubSocketServer().start()
+        self.addCleanup(self.server.stop)
+
+    def manager(self, symbols, per_connection=10):
+        manager = FinnHubSocketManager(symbols, token='test', uri=self.server.uri,
+                                       symbols_per_connection=per_connection,
+                                       backoff_base=0.05, backoff_max=0.1)
+        self.addCleanup(manager.stop)
+        return manager
+
+    def connections(self):
+        """Symbols subscribed on each open connection of the server."""
+        with self.server._lock:
+            return [set(c.symbols) for c in self.server.clients]
+
+    def wait_subscribed(self, symbols, n_connections):
+        wait_for(lambda: len(self.connections()) == n_connections and
+                 self.server.subscribed() == set(symbols))
+
+    def receive_trades(self, manager, symbols, price):
+        """Publish one trade per symbol, return the symbols of the trades received."""
+        for symbol in symbols:
+            self.assertEqual(self.server.publish(symbol, price), 1)
+        received = []
+        while len(received) < len(symbols):
+            message = manager.get(timeout=TIMEOUT)
+            self.assertIsNotNone(message, 'Trades missing: {}'.format(
+                sorted(set(symbols) - set(received))))
+            message = json.loads(message)
+            self.assertEqual(message['type'], 'trade')
+            for trade in message['data']:
+                self.assertEqual(trade['p'], price)
+                received.append(trade['s'])
+        return received
+
+    def test_sharding(self):
+        symbols = ['SYM{}'.format(i) for i in range(25)]
+        manager = self.manager(symbols, per_connection=10).start()
+        self.wait_subscribed(symbols, 3)
+
+        connections = self.connections()
+        self.assertEqual(sorted(len(c) for c in connections), [5, 10, 10])
+        self.assertEqual(sum(len(c) for c in connections), len(symbols))
+        self.assertEqual(sorted(sorted(s.symbols) for s in manager.shards),
+                         sorted(sorted(c) for c in connections))
+
+        self.assertEqual(sorted(self.receive_trades(manager, symbols, 100.0)), sorted(symbols))
+        self.assertEqual(manager.stats()['dropped'], 0)
+
+    def test_subscribe_after_start(self):
+        manager = self.manager(['AAPL', 'MSFT'], per_connection=2).start()
+        self.wait_subscribed(['AAPL', 'MSFT'], 1)
+
+        manager.subscribe('spy')
+        manager.unsubscribe('MSFT')
+        self.wait_subscribed(['AAPL', 'SPY'], 2)
+        self.assertEqual(manager.symbols, ['AAPL', 'SPY'])
+        self.assertEqual(self.server.publish('MSFT', 1.0), 0)
+
+    def test_reconnect_resubscribes(self):
+        symbols = ['SYM{}'.format(i) for i in range(15)]
+        manager = self.manager(symbols, per_connection=10).start()
+        self.wait_subscribed(symbols, 2)
+        self.receive_trades(manager, symbols, 100.0)
+
+        self.server.drop_connections()
+        # The stand-in only counts opened connections, so two more mean
+        # both shards came back
+        wait_for(lambda: self.server.connections >= 4)
+        self.wait_subscribed(symbols, 2)
+        wait_for(lambda: all(s.connected.is_set() for s in manager.shards))
+
+        self.assertEqual([len(c) for c in sorted(self.connections(), key=len)], [5, 10])
+        self.assertTrue(all(s.reconnects >= 1 for s in manager.shards))
+        self.assertEqual(sorted(self.receive_trades(manager, symbols, 101.0)), sorted(symbols))
+
+        start = time.time()
+        manager.stop(timeout=TIMEOUT)
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(any(s._thread.is_alive() for s in manager.shards))
+        wait_for(lambda: not self.connections())
+
+    def test_stop_before_start(self):
+        manager = self.manager(['AAPL', 'MSFT', 'SPY'], per_connection=2)
+        self.assertEqual(len(manager.shards), 2)
+
+        start = time.time()
+        manager.stop(timeout=1)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.server.connections, 0)
+        self.assertEqual(manager.symbols, ['AAPL', 'MSFT', 'SPY'])
+        self.assertEqual(list(manager.messages(timeout=0.01)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()